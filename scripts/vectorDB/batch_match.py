@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import asyncio
+
+from pathlib import Path
+from loguru import logger
+from itertools import batched
+from concurrent.futures import ThreadPoolExecutor
+from qdrant_client import models
+
+from .vector_store import aget_embeddings
+from .chunker import truncate_text
+from .embedding_batcher import PendingChunk, pack_batches
+from .vector_search import search_filter
+from .embedding_backends import DEFAULT_MODEL, get_backend, close_async_clients as close_embedding_clients
+from .sparse_vectors import sparse_vector
+from .collection_profiles import DEFAULT_PROFILE, get_profile
+from .resume_parser import parse_resume, resume_queries
+from .qdrant_clients import close_async_clients, get_async_client, get_client, is_local
+from .chunk_store import is_shared, job_hits
+
+
+RESUME_TYPES = (".pdf", ".docx", ".txt")
+#? Resumes embedded together, their sections go out in a single embeddings request
+RESUMES_PER_BATCH = 64
+#? Resumes per query_batch_points request
+QUERIES_PER_REQUEST = 16
+#? Chunk hits fetched per resume before collapsing them to distinct jobs
+OVERFETCH = 4
+
+
+def resume_files(directory: str) -> list[str]:
+    return sorted(
+        os.path.join(directory, file)
+        for file in os.listdir(directory)
+        if file.lower().endswith(RESUME_TYPES)
+    )
+
+
+def finished_resumes(output: str) -> set[str]:
+    """Resumes that already have a result line, so a restarted run skips them"""
+    if not os.path.exists(output):
+        return set()
+    done = set()
+    with open(output, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["resume"])
+            except (json.JSONDecodeError, KeyError):
+                #? A run killed mid-write leaves one torn line, that resume is simply redone
+                continue
+    return done
+
+
+def top_jobs(points: list[models.ScoredPoint], filter_dict: dict, k: int) -> list[tuple[str, float]]:
+    """Collapse chunk hits to each job's best score, keeping Qdrant's ranking"""
+    hits = []
+    for point in points:
+        jobkeys = point.payload.get("jobkey")
+        #? A shared chunk is a hit for every job using it
+        for jobkey in (jobkeys if is_shared(point.payload) else [jobkeys]):
+            hits.append((jobkey, point))
+
+    jobs = {}
+    for point in job_hits(hits, filter_dict):
+        jobkey = point.payload.get("jobkey")
+        if jobkey not in jobs:
+            jobs[jobkey] = point.score
+            if len(jobs) == k:
+                break
+    return list(jobs.items())
+
+
+async def query_batch(collection: str, requests: list[models.QueryRequest]) -> list[models.QueryResponse]:
+    if is_local():
+        #? The embedded client has no async twin, run it off the event loop instead
+        return await asyncio.to_thread(get_client().query_batch_points, collection, requests)
+    return await get_async_client().query_batch_points(collection_name=collection, requests=requests)
+
+
+async def match_batch(
+    paths: list[str],
+    collection: str,
+    model_name: str,
+    profile: str,
+    filter_dict: dict,
+    k: int,
+    parser: ThreadPoolExecutor,
+    slots: asyncio.Semaphore,
+) -> list[dict]:
+    """Parse, embed and search one batch of resumes, returning their result rows in input order.
+
+    A resume that cannot be parsed, embedded or searched gets an error row instead of
+    stopping the run, so a restart never gets stuck on the same bad file.
+    """
+    loop = asyncio.get_running_loop()
+    texts = await asyncio.gather(*(loop.run_in_executor(parser, parse_resume, path) for path in paths), return_exceptions=True)
+
+    rows = {}
+    pending = []
+    max_input = get_backend(model_name).max_input_tokens
+    for path, text in zip(paths, texts):
+        if isinstance(text, Exception):
+            logger.error(f"Skipping {path}: {text}")
+            rows[path] = {"resume": path, "error": str(text)}
+            continue
+        #? A CV without recognized headings is one query, cut it to what the model accepts
+        for query in resume_queries(text):
+            query, tokens = truncate_text(query, max_input, model_name)
+            pending.append(PendingChunk(path, query, tokens, {}))
+
+    #? Sections go out packed to the provider limits, a failed request only fails the resumes in it
+    vectors = {}
+    for batch in pack_batches(pending, model_name):
+        try:
+            embeddings = await aget_embeddings([chunk.text for chunk in batch], model_name, {chunk.text: chunk.tokens for chunk in batch})
+        except Exception as e:
+            logger.error(f"Embedding {len(batch)} resume sections failed: {e}")
+            for chunk in batch:
+                rows[chunk.id] = {"resume": chunk.id, "error": f"Embedding failed: {e}"}
+            continue
+        for chunk, vector in zip(batch, embeddings):
+            vectors.setdefault(chunk.id, []).append(vector)
+
+    collection_profile = get_profile(profile)
+    query_filter = search_filter(filter_dict)
+    for path in paths:
+        if path not in rows and path not in vectors:
+            rows[path] = {"resume": path, "error": "No text to embed"}
+    searched = [(path, text) for path, text in zip(paths, texts) if path not in rows]
+    requests = []
+    for path, text in searched:
+        query = collection_profile.fused_query_kwargs(vectors[path], k * OVERFETCH, sparse_vector(text, query=True))
+        #? QueryRequest names the search parameters `params`
+        if "search_params" in query:
+            query["params"] = query.pop("search_params")
+        requests.append(
+            models.QueryRequest(
+                filter = query_filter,
+                limit = k * OVERFETCH,
+                with_payload = ["jobkey"],
+                **query,
+            )
+        )
+
+    async def send(group):
+        async with slots:
+            return await query_batch(collection, list(group))
+
+    groups = list(batched(zip(searched, requests), QUERIES_PER_REQUEST))
+    responses = await asyncio.gather(*(send(request for _, request in group) for group in groups), return_exceptions=True)
+    for group, response in zip(groups, responses):
+        if isinstance(response, Exception):
+            logger.error(f"Searching {len(group)} resumes failed: {response}")
+            for (path, _), _ in group:
+                rows[path] = {"resume": path, "error": f"Search failed: {response}"}
+            continue
+        for ((path, _), _), result in zip(group, response):
+            jobs = top_jobs(result.points, filter_dict, k)
+            rows[path] = {"resume": path, "jobkeys": [jobkey for jobkey, _ in jobs], "scores": [score for _, score in jobs]}
+    return [rows[path] for path in paths]
+
+
+async def amatch_resumes(
+    paths: list[str],
+    output: str,
+    collection: str = "ds_jobs",
+    model_name: str = DEFAULT_MODEL,
+    profile: str = DEFAULT_PROFILE,
+    filter_dict: dict | None = None,
+    k: int = 50,
+    concurrency: int = 4,
+    parse_workers: int = 8,
+):
+    """Match every resume against the collection, appending one JSON line of ranked jobkeys per resume.
+
+    Resumes already in `output` are skipped, so an interrupted run picks up where it
+    stopped. At most `concurrency` query_batch_points requests are in flight at once.
+    """
+    done = finished_resumes(output)
+    todo = [path for path in paths if path not in done]
+    logger.info(f"Matching {len(todo)} resumes ({len(done)} already done) against {collection}")
+    if not todo:
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    if os.path.exists(output) and os.path.getsize(output):
+        #? Terminate a torn last line so the first new result starts on a line of its own
+        with open(output, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    slots = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    matched = 0
+    with ThreadPoolExecutor(max_workers=parse_workers) as parser, open(output, "a", encoding="utf-8") as f:
+        for batch in batched(todo, RESUMES_PER_BATCH):
+            rows = await match_batch(list(batch), collection, model_name, profile, filter_dict or {}, k, parser, slots)
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            #? Flush per batch so a restart only ever redoes the batch that was running
+            f.flush()
+            matched += len(rows)
+            elapsed = time.perf_counter() - start
+            logger.info(f"Matched {matched}/{len(todo)} resumes, {matched / elapsed:.1f} resumes/s")
+
+
+def match_resumes(paths: list[str], output: str, **kwargs):
+    async def run():
+        try:
+            await amatch_resumes(paths, output, **kwargs)
+        finally:
+            #? The loop ends with the run, its Qdrant and embedding clients go with it
+            await close_async_clients()
+            await close_embedding_clients()
+
+    asyncio.run(run())
+
+
+def to_parquet(output: str, parquet_path: str):
+    """Convert the JSON Lines results to Parquet once a run is complete"""
+    import pyarrow.json as pj
+    import pyarrow.parquet as pq
+
+    pq.write_table(pj.read_json(output), parquet_path)
+
+
+if __name__ == "__main__":
+    BASE_DIR = Path(__file__).resolve().parents[2]
+    resume_dir = os.path.join(BASE_DIR, "data/resumes")
+    output = os.path.join(BASE_DIR, "data/matches/resume_matches.jsonl")
+
+    match_resumes(resume_files(resume_dir), output)
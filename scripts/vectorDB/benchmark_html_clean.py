@@ -0,0 +1,59 @@
+import os
+import json
+import time
+import statistics
+
+from pathlib import Path
+from itertools import islice
+
+from .vector_store import input_files, iter_raw_jobs
+from .html_clean import clean_description, clean_description_bs4
+
+
+def load_descriptions(paths: list[str], limit: int = 2000) -> list[str]:
+    """Read real job descriptions from crawled job files, skipping jobs without one"""
+    jobs = (json.loads(raw) for raw in iter_raw_jobs(paths))
+    return list(islice((job["description"] for job in jobs if job.get("description")), limit))
+
+
+def time_cleaner(cleaner, descriptions: list[str], rounds: int = 3) -> float:
+    """Best-of-n wall time for cleaning every description once"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for html in descriptions:
+            cleaner(html)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark_html_clean(paths: list[str], limit: int = 2000, rounds: int = 3) -> dict:
+    descriptions = load_descriptions(paths, limit)
+    if not descriptions:
+        raise ValueError("No job descriptions found in the given files")
+
+    baseline = time_cleaner(clean_description_bs4, descriptions, rounds)
+    fast = time_cleaner(clean_description, descriptions, rounds)
+    #? How often the plain text we embed is identical to what the BeautifulSoup path produced
+    same_text = statistics.fmean(
+        clean_description(html)[1] == clean_description_bs4(html)[1]
+        for html in descriptions
+    )
+    return {
+        "descriptions": len(descriptions),
+        "bs4_ms_per_doc": baseline / len(descriptions) * 1000,
+        "fast_ms_per_doc": fast / len(descriptions) * 1000,
+        "speedup": baseline / fast,
+        "same_text": same_text,
+    }
+
+
+if __name__ == "__main__":
+    BASE_DIR = Path(__file__).resolve().parents[2]
+    data_dir = os.path.join(BASE_DIR, "data/processed_data/ds_jobs")
+    #? The crawl is not checked in, the fixture set keeps the benchmark runnable from a clean checkout
+    fixture = os.path.join(BASE_DIR, "tests/fixtures/jobs.jsonl")
+
+    results = benchmark_html_clean(input_files(data_dir) if os.path.isdir(data_dir) else [fixture])
+    for name, value in results.items():
+        print(f"{name:>16}: {value:.3f}" if isinstance(value, float) else f"{name:>16}: {value}")
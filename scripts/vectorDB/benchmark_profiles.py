@@ -0,0 +1,135 @@
+import time
+import random
+import statistics
+
+from loguru import logger
+from qdrant_client import QdrantClient, models
+
+from .vector_store import init_vectorDB
+from .sparse_vectors import SPARSE_VECTOR
+from .collection_profiles import PROFILES, CollectionProfile, full_vector
+
+
+def keyword_vector(vector) -> models.SparseVector | None:
+    return vector.get(SPARSE_VECTOR) if isinstance(vector, dict) else None
+
+
+def vector_size(client: QdrantClient, collection: str) -> int:
+    vectors = client.get_collection(collection).config.params.vectors
+    return vectors["full"].size if isinstance(vectors, dict) else vectors.size
+
+
+def copy_collection(client: QdrantClient, source: str, target: str, profile: CollectionProfile, batch_size: int = 256):
+    """Rebuild the source collection's points into a new collection laid out with the given profile"""
+    size = vector_size(client, source)
+    if client.collection_exists(target):
+        client.delete_collection(target)
+    client.create_collection(
+        collection_name = target,
+        vectors_config = profile.vectors_config(size),
+        sparse_vectors_config = profile.sparse_vectors_config(),
+        hnsw_config = profile.hnsw_config(),
+        quantization_config = profile.quantization_config(),
+    )
+
+    offset = None
+    while True:
+        points, offset = client.scroll(source, limit=batch_size, offset=offset, with_vectors=True, with_payload=True)
+        client.upsert(
+            collection_name = target,
+            points = [
+                models.PointStruct(id=p.id, vector=profile.point_vector(full_vector(p.vector), keyword_vector(p.vector)), payload=p.payload)
+                for p in points
+            ],
+        )
+        if offset is None:
+            break
+
+
+def wait_until_indexed(client: QdrantClient, collection: str, timeout: float = 1800):
+    start = time.time()
+    while client.get_collection(collection).status != models.CollectionStatus.GREEN:
+        if time.time() - start > timeout:
+            raise TimeoutError(f"{collection} is still indexing after {timeout}s")
+        time.sleep(2)
+
+
+def sample_queries(client: QdrantClient, collection: str, n: int, seed: int = 0) -> list[list[float]]:
+    """Use the vectors of randomly chosen stored chunks as query vectors"""
+    points, _ = client.scroll(collection, limit=max(n * 10, 1000), with_vectors=True, with_payload=False)
+    random.Random(seed).shuffle(points)
+    return [full_vector(p.vector) for p in points[:n]]
+
+
+def measure_profile(client: QdrantClient, source: str, target: str, profile: CollectionProfile, queries: list, k: int) -> dict:
+    """Recall@k of the profile's collection against exact search on the source, plus its latency and size"""
+    source_vectors = client.get_collection(source).config.params.vectors
+    using = "full" if isinstance(source_vectors, dict) else None
+
+    recalls = []
+    latencies = []
+    for query in queries:
+        exact = client.query_points(
+            collection_name = source,
+            query = query,
+            using = using,
+            limit = k,
+            search_params = models.SearchParams(exact=True),
+        ).points
+
+        start = time.perf_counter()
+        approx = client.query_points(
+            collection_name = target,
+            limit = k,
+            **profile.query_kwargs(query, k),
+        ).points
+        latencies.append(time.perf_counter() - start)
+
+        expected = {p.id for p in exact}
+        recalls.append(len(expected & {p.id for p in approx}) / max(1, len(expected)))
+
+    info = client.get_collection(target)
+    per_vector = profile.bytes_per_vector(vector_size(client, target))
+    points = info.points_count or 0
+    return {
+        "profile": profile.name,
+        "points": points,
+        "ram_mib": points * per_vector["ram"] / 1024**2,
+        "disk_mib": points * per_vector["disk"] / 1024**2,
+        f"recall@{k}": statistics.fmean(recalls),
+        "latency_ms_p50": statistics.median(latencies) * 1000,
+    }
+
+
+def benchmark_profiles(source: str, profiles: list[str], n_queries: int = 200, k: int = 10, keep: bool = False) -> list[dict]:
+    client = init_vectorDB()
+    queries = sample_queries(client, source, n_queries)
+
+    results = []
+    for name in profiles:
+        profile = PROFILES[name]
+        target = f"{source}__{name}"
+        logger.info(f"Building {target}")
+        copy_collection(client, source, target, profile)
+        wait_until_indexed(client, target)
+        results.append(measure_profile(client, source, target, profile, queries, k))
+        if not keep:
+            client.delete_collection(target)
+
+    return results
+
+
+def format_results(results: list[dict]):
+    headers = list(results[0].keys())
+    print(" | ".join(f"{h:>14}" for h in headers))
+    print("-" * (17 * len(headers)))
+    for row in results:
+        print(" | ".join(f"{v:>14.3f}" if isinstance(v, float) else f"{v:>14}" for v in row.values()))
+
+
+if __name__ == "__main__":
+    collection = "ds_jobs"
+    profiles = list(PROFILES)
+
+    results = benchmark_profiles(collection, profiles)
+    format_results(results)
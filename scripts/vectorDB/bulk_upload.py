@@ -0,0 +1,127 @@
+import json
+import time
+import threading
+
+from loguru import logger
+from concurrent.futures import Future, ThreadPoolExecutor
+from qdrant_client import QdrantClient, models
+
+
+MAX_BATCH_BYTES = 8 * 1024**2
+MAX_BATCH_POINTS = 1024
+#? Qdrant's default, used when the collection config does not report one
+DEFAULT_INDEXING_THRESHOLD = 20_000
+
+
+def point_size(point: models.PointStruct, grpc: bool = False) -> int:
+    """Rough serialized size of a point, floats cost ~4 bytes over gRPC and ~20 as JSON text"""
+    vectors = point.vector.values() if isinstance(point.vector, dict) else [point.vector]
+    floats = sum(len(v) for v in vectors if isinstance(v, list))
+    payload = len(json.dumps(point.payload, ensure_ascii=False, default=str)) if point.payload else 0
+    return floats * (4 if grpc else 20) + payload + 64
+
+
+class BulkUploader:
+    """Parallel, pipelined upserts for full re-indexes of a collection.
+
+    Points are grouped into batches by serialized size, and several worker threads send
+    them with wait=False, so the server acks each batch into its WAL without waiting
+    for it to be applied. The last batch is held back and sent with wait=True once every
+    other batch is acked, which acts as the consistency barrier.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection: str,
+        workers: int = 4,
+        max_batch_bytes: int = MAX_BATCH_BYTES,
+        max_batch_points: int = MAX_BATCH_POINTS,
+        defer_indexing: bool = True,
+        grpc: bool = False,
+    ):
+        self.client = client
+        self.collection = collection
+        self.grpc = grpc
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_points = max_batch_points
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qdrant-upload")
+        #? Bound the batches queued in the executor so a fast producer cannot buffer the whole corpus
+        self.slots = threading.BoundedSemaphore(workers * 2)
+        self.futures: list[Future] = []
+        self.batch: list[models.PointStruct] = []
+        self.batch_bytes = 0
+        self.uploaded = 0
+        self.lock = threading.Lock()
+        self.indexing_threshold = None
+
+        if defer_indexing:
+            self.pause_indexing()
+
+    def pause_indexing(self):
+        """Stop HNSW indexing during the load, it is rebuilt once at the end instead of per segment"""
+        config = self.client.get_collection(self.collection).config.optimizer_config
+        self.indexing_threshold = config.indexing_threshold or DEFAULT_INDEXING_THRESHOLD
+        self.client.update_collection(
+            collection_name = self.collection,
+            optimizers_config = models.OptimizersConfigDiff(indexing_threshold=0),
+        )
+
+    def resume_indexing(self):
+        if self.indexing_threshold is None:
+            return
+        self.client.update_collection(
+            collection_name = self.collection,
+            optimizers_config = models.OptimizersConfigDiff(indexing_threshold=self.indexing_threshold),
+        )
+        self.indexing_threshold = None
+
+    def add(self, points: list[models.PointStruct]):
+        for point in points:
+            size = point_size(point, self.grpc)
+            if self.batch and (self.batch_bytes + size > self.max_batch_bytes or len(self.batch) >= self.max_batch_points):
+                self.submit(self.batch)
+                self.batch = []
+                self.batch_bytes = 0
+            self.batch.append(point)
+            self.batch_bytes += size
+
+    def submit(self, batch: list[models.PointStruct]):
+        self.slots.acquire()
+        future = self.executor.submit(self.upload, batch, False)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+
+        #? Raise upload errors as they happen and drop finished futures so the list stays short
+        pending = []
+        for f in self.futures:
+            if f.done():
+                f.result()
+            else:
+                pending.append(f)
+        self.futures = pending
+
+    def upload(self, batch: list[models.PointStruct], wait: bool):
+        self.client.upsert(collection_name=self.collection, points=batch, wait=wait)
+        with self.lock:
+            self.uploaded += len(batch)
+
+    def finish(self, wait_indexed: bool = False, timeout: float = 3600):
+        """Flush, wait for every batch to be acked, apply the barrier batch and re-enable indexing"""
+        try:
+            for future in self.futures:
+                future.result()
+            if self.batch:
+                self.upload(self.batch, wait=True)
+                self.batch = []
+        finally:
+            self.executor.shutdown(wait=True)
+            self.resume_indexing()
+
+        if wait_indexed:
+            start = time.time()
+            while self.client.get_collection(self.collection).status != models.CollectionStatus.GREEN:
+                if time.time() - start > timeout:
+                    raise TimeoutError(f"{self.collection} is still indexing after {timeout}s")
+                time.sleep(5)
+        logger.info(f"Bulk upload finished: {self.uploaded} points in {self.collection}")
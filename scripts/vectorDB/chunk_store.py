@@ -0,0 +1,150 @@
+import os
+import re
+import sqlite3
+import hashlib
+import unicodedata
+
+from uuid import NAMESPACE_DNS, uuid5
+from loguru import logger
+from itertools import batched, groupby
+from qdrant_client import QdrantClient, models
+
+from .doc_store import get_doc_store
+from .filters import matches_filters, union_filters
+
+
+#? A chunk used by more companies than this is boilerplate (EEO statements, benefits blurbs, ATS footers)
+BOILERPLATE_COMPANIES = int(os.environ.get("CVEC_BOILERPLATE_COMPANIES", 3))
+#? Leave boilerplate chunks out of retrieval, they match every resume equally well
+SKIP_BOILERPLATE = os.environ.get("CVEC_SKIP_BOILERPLATE", "1").lower() in ("1", "true", "yes")
+#? Chunks looked up in the collection per request, to find the jobs earlier runs listed on them
+LOOKUP_BATCH = 256
+SPACE = re.compile(r"\s+")
+
+
+def normalize_chunk(text: str) -> str:
+    return SPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def chunk_id(text: str) -> str:
+    """Point ID of a chunk, derived from its normalized text so identical chunks share one point"""
+    digest = hashlib.blake2b(normalize_chunk(text).encode("utf-8"), digest_size=16).hexdigest()
+    return str(uuid5(NAMESPACE_DNS, f"chunk-{digest}"))
+
+
+def is_shared(payload: dict) -> bool:
+    """Shared chunks list every job that uses them under `jobkey`"""
+    return isinstance(payload.get("jobkey"), list)
+
+
+class ChunkStore:
+    """Content-addressed chunks for one ingest run: each distinct chunk text is embedded and stored once.
+
+    The first job to use a chunk gives the point its payload. Once the load is done, `apply`
+    turns the `jobkey` of every chunk used by several jobs into the list of those jobs, so
+    grouping by jobkey puts the point in each of their groups. Filters and companies come
+    from the jobs' stored cards, which by then carry any near-duplicate merges.
+
+    With a client, the jobs that earlier loads listed on a chunk already in the collection
+    are read before this run overwrites it, and stay on its list.
+    """
+
+    def __init__(self, client: QdrantClient | None = None, collection: str | None = None, boilerplate_companies: int = BOILERPLATE_COMPANIES):
+        self.client = client
+        self.collection = collection
+        self.boilerplate_companies = boilerplate_companies
+        self.conn = sqlite3.connect("")
+        #* chunk ID -> jobkey of the first job using it
+        self.conn.execute("CREATE TABLE chunks (id TEXT PRIMARY KEY, jobkey TEXT) WITHOUT ROWID")
+        #* Every other job using a chunk
+        self.conn.execute("CREATE TABLE refs (id TEXT NOT NULL, jobkey TEXT NOT NULL, PRIMARY KEY (id, jobkey)) WITHOUT ROWID")
+        self.skipped = 0
+
+    def stored_jobkeys(self, ids: list[str]) -> dict[str, list[str]]:
+        """Jobkeys already listed on the points of these chunk IDs that exist in the collection"""
+        if self.client is None or not ids:
+            return {}
+        points = self.client.retrieve(self.collection, ids=ids, with_payload=["jobkey"], with_vectors=False)
+        stored = {}
+        for point in points:
+            jobkey = point.payload.get("jobkey")
+            stored[str(point.id)] = jobkey if isinstance(jobkey, list) else [jobkey]
+        return stored
+
+    def filter(self, chunks):
+        """Give chunks their content IDs and only pass on the first copy of each"""
+        for batch in batched(chunks, LOOKUP_BATCH):
+            batch = [(chunk_id(chunk.text), chunk) for chunk in batch]
+            ids = list(dict.fromkeys(cid for cid, _ in batch))
+            seen = {row[0] for row in self.conn.execute(f"SELECT id FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids)}
+            stored = self.stored_jobkeys([cid for cid in ids if cid not in seen])
+
+            for cid, chunk in batch:
+                jobkey = chunk.payload.get("jobkey")
+                first = self.conn.execute("SELECT jobkey FROM chunks WHERE id = ?", (cid,)).fetchone()
+                if first is None:
+                    self.conn.execute("INSERT INTO chunks (id, jobkey) VALUES (?, ?)", (cid, jobkey))
+                    #? The upsert replaces the point's payload, keep the jobs earlier loads listed on it
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO refs (id, jobkey) VALUES (?, ?)",
+                        [(cid, other) for other in stored.get(cid, []) if other is not None and other != jobkey],
+                    )
+                    yield chunk._replace(id=cid)
+                    continue
+
+                if jobkey != first[0]:
+                    self.conn.execute("INSERT OR IGNORE INTO refs (id, jobkey) VALUES (?, ?)", (cid, jobkey))
+                self.skipped += 1
+
+    def shared_payload(self, jobkeys: list[str]) -> dict:
+        """Jobkeys, boilerplate flag and the union of filter values of every job using a shared chunk"""
+        cards = get_doc_store().get_cards(jobkeys)
+        companies = {card.get("companyName") for card in cards.values()}
+        return {
+            "jobkey": jobkeys,
+            "filters": union_filters(list(cards.values())),
+            "boilerplate": len(companies) > self.boilerplate_companies,
+        }
+
+    def apply(self, client: QdrantClient, collection: str):
+        """Write the job lists and boilerplate flags onto the shared chunk points, after any near-duplicate merge"""
+        shared = 0
+        boilerplate = 0
+        rows = self.conn.execute("SELECT refs.id, chunks.jobkey, refs.jobkey FROM refs JOIN chunks ON chunks.id = refs.id ORDER BY refs.id")
+        for cid, group in groupby(rows, key=lambda row: row[0]):
+            group = list(group)
+            payload = self.shared_payload([group[0][1]] + [jobkey for _, _, jobkey in group])
+            client.set_payload(collection_name=collection, payload=payload, points=[cid])
+            shared += 1
+            boilerplate += payload["boilerplate"]
+        logger.info(f"Skipped {self.skipped} repeated chunks, {shared} chunks are shared by several jobs ({boilerplate} boilerplate)")
+        self.conn.close()
+
+
+def boilerplate_condition() -> list[models.Condition]:
+    """`must_not` conditions of a search, empty when boilerplate chunks stay searchable"""
+    if not SKIP_BOILERPLATE:
+        return []
+    return [models.FieldCondition(key="boilerplate", match=models.MatchValue(value=True))]
+
+
+def job_hits(hits: list[tuple[str, models.ScoredPoint]], filter_dict: dict) -> list[models.ScoredPoint]:
+    """Resolve (jobkey, hit) pairs into job results.
+
+    A hit on a shared chunk carries the card of whichever job stored it first, so it gets
+    the card of the job it stands for from the document store instead. The shared point
+    matched the search filter through the union of its jobs' values, so the job itself is
+    checked again and dropped if the filters exclude it.
+    """
+    shared = [jobkey for jobkey, hit in hits if is_shared(hit.payload)]
+    cards = get_doc_store().get_cards(shared) if shared else {}
+
+    results = []
+    for jobkey, hit in hits:
+        if is_shared(hit.payload):
+            card = cards.get(jobkey)
+            if card is None or not matches_filters(card.get("filters") or {}, filter_dict):
+                continue
+            hit = hit.model_copy(update={"payload": {**card, "chunkText": hit.payload.get("chunkText")}})
+        results.append(hit)
+    return results
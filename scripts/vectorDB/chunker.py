@@ -0,0 +1,152 @@
+import re
+import tiktoken
+
+from bisect import bisect_left
+from functools import lru_cache
+from typing import NamedTuple
+
+
+CHUNK_SIZE = 230
+CHUNK_OVERLAP = 128
+
+#? Same sentence delimiters as chonkie's SentenceChunker, the delimiter stays with the previous sentence
+SENTENCE_END = re.compile(r"[.!?]\s+|\n+")
+
+
+class Chunk(NamedTuple):
+    text: str
+    start: int
+    end: int
+    tokens: int
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str = "text-embedding-3-large") -> tiktoken.Encoding:
+    """Return the tokenizer for a model, resolved once per process"""
+    try:
+        name = tiktoken.encoding_name_for_model(model_name)
+    except KeyError:
+        name = "cl100k_base"
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        #? tiktoken downloads encodings on first use, offline machines need them pre-cached
+        raise RuntimeError(f"Could not load the {name} tokenizer ({e}), offline runs need it cached in TIKTOKEN_CACHE_DIR") from e
+
+
+def truncate_text(text: str, max_tokens: int, model_name: str = "text-embedding-3-large") -> tuple[str, int]:
+    """Cut a text down to its first max_tokens tokens, returning it with its token count"""
+    encoding = get_encoding(model_name)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    return encoding.decode(tokens[:max_tokens]), max_tokens
+
+
+def token_offsets(text: str, tokens: list[int], encoding: tiktoken.Encoding) -> list[int]:
+    """Return the character offset where each token starts"""
+    _, offsets = encoding.decode_with_offsets(tokens)
+    return offsets
+
+
+def split_sentences(text: str) -> list[tuple[int, int]]:
+    """Return the (start, end) character spans of the sentences in the text"""
+    spans = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        if match.end() > start and text[start:match.start()].strip():
+            spans.append((start, match.end()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def chunk_tokens(
+    text: str,
+    offsets: list[int],
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+) -> list[Chunk]:
+    """Group sentences into chunks of at most chunk_size tokens, overlapping by up to chunk_overlap tokens.
+
+    `offsets` are the token start offsets of the already tokenized text, so sentence token
+    counts come from a bisect instead of tokenizing every sentence again.
+    """
+    spans = split_sentences(text)
+    bounds = [bisect_left(offsets, start) for start, _ in spans] + [len(offsets)]
+    counts = [bounds[i + 1] - bounds[i] for i in range(len(spans))]
+
+    def make_chunk(start: int, end: int, tokens: int) -> Chunk:
+        return Chunk(text[start:end].strip(), start, end, tokens)
+
+    chunks = []
+    i = 0
+    while i < len(spans):
+        #? A single sentence over the limit is cut into token windows instead of being sent whole
+        if counts[i] > chunk_size:
+            first, last = bounds[i], bounds[i + 1]
+            step = max(1, chunk_size - chunk_overlap)
+            for t in range(first, last, step):
+                t_end = min(t + chunk_size, last)
+                end = offsets[t_end] if t_end < len(offsets) else spans[i][1]
+                chunks.append(make_chunk(offsets[t], end, t_end - t))
+                if t_end == last:
+                    break
+            i += 1
+            continue
+
+        j = i
+        total = 0
+        while j < len(spans) and counts[j] <= chunk_size and total + counts[j] <= chunk_size:
+            total += counts[j]
+            j += 1
+        chunks.append(make_chunk(spans[i][0], spans[j - 1][1], total))
+        if j >= len(spans):
+            break
+
+        #? Start the next chunk on the trailing sentences that fit in the overlap, always moving forward.
+        #? The overlap must leave room for sentence j, or the next chunk would repeat this one's tail and
+        #? add nothing new; a sentence over the limit gets no overlap at all.
+        k = j
+        overlap = 0
+        while k - 1 > i and overlap + counts[k - 1] <= chunk_overlap and overlap + counts[k - 1] + counts[j] <= chunk_size:
+            overlap += counts[k - 1]
+            k -= 1
+        i = k
+
+    return [chunk for chunk in chunks if chunk.text]
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    model_name: str = "text-embedding-3-large",
+) -> list[Chunk]:
+    """Tokenize the text once and split it into overlapping sentence chunks, or one chunk if it fits"""
+    encoding = get_encoding(model_name)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= chunk_size:
+        return [Chunk(text, 0, len(text), len(tokens))] if text.strip() else []
+    return chunk_tokens(text, token_offsets(text, tokens, encoding), chunk_size, chunk_overlap)
+
+
+def chunk_texts(
+    texts: list[str],
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    model_name: str = "text-embedding-3-large",
+    num_threads: int = 8,
+) -> list[list[Chunk]]:
+    """Batch version of chunk_text, encoding all texts in one multi-threaded tiktoken call"""
+    encoding = get_encoding(model_name)
+    all_tokens = encoding.encode_batch(texts, num_threads=num_threads, disallowed_special=())
+
+    results = []
+    for text, tokens in zip(texts, all_tokens):
+        if len(tokens) <= chunk_size:
+            results.append([Chunk(text, 0, len(text), len(tokens))] if text.strip() else [])
+        else:
+            results.append(chunk_tokens(text, token_offsets(text, tokens, encoding), chunk_size, chunk_overlap))
+    return results
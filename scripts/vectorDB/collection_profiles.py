@@ -0,0 +1,191 @@
+import os
+import math
+
+from dataclasses import dataclass
+from qdrant_client import models
+
+from .sparse_vectors import SPARSE_VECTOR, sparse_vectors_config
+
+
+#* Candidate-tier size for the two-tier profile, text-embedding-3 keeps most of its quality at 256 or 512
+MATRYOSHKA_DIM = int(os.environ.get("CVEC_MATRYOSHKA_DIM", 256))
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """How a jobs collection stores and indexes its vectors, and the matching search parameters"""
+
+    name: str
+    on_disk: bool = False
+    datatype: models.Datatype | None = None
+    quantization: str | None = None
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_ef: int | None = None
+    oversampling: float = 1.0
+    rescore: bool = True
+    matryoshka_dim: int | None = None
+    matryoshka_candidates: int = 4
+    fusion_candidates: int = 2
+    sparse: bool = True
+
+    @property
+    def vector_name(self) -> str | None:
+        """Name of the vector holding the full embedding, None for single unnamed-vector collections"""
+        return "full" if self.matryoshka_dim else None
+
+    def vectors_config(self, size: int) -> models.VectorParams | dict[str, models.VectorParams]:
+        if not self.matryoshka_dim:
+            return models.VectorParams(
+                size = size,
+                distance = models.Distance.COSINE,
+                on_disk = self.on_disk,
+                datatype = self.datatype,
+            )
+
+        #? Only the short vector gets an HNSW graph, the full one is read from disk to rescore candidates
+        return {
+            "small": models.VectorParams(
+                size = self.matryoshka_dim,
+                distance = models.Distance.COSINE,
+                datatype = self.datatype,
+            ),
+            "full": models.VectorParams(
+                size = size,
+                distance = models.Distance.COSINE,
+                on_disk = True,
+                datatype = self.datatype,
+                hnsw_config = models.HnswConfigDiff(m=0),
+            ),
+        }
+
+    def sparse_vectors_config(self) -> dict[str, models.SparseVectorParams] | None:
+        return sparse_vectors_config() if self.sparse else None
+
+    def point_vector(self, vector: list[float], sparse: models.SparseVector | None = None) -> list[float] | dict:
+        vectors = {"small": truncate_vector(vector, self.matryoshka_dim), "full": vector} if self.matryoshka_dim else {"": vector}
+        if self.sparse and sparse is not None:
+            vectors[SPARSE_VECTOR] = sparse
+        return vectors if len(vectors) > 1 else vector
+
+    def query_kwargs(self, query: list[float], limit: int) -> dict:
+        """Query arguments for query_points/query_points_groups, with a short-vector prefetch when two-tier"""
+        if not self.matryoshka_dim:
+            return {"query": query, "search_params": self.search_params()}
+
+        return {
+            "prefetch": models.Prefetch(
+                query = truncate_vector(query, self.matryoshka_dim),
+                using = "small",
+                limit = limit * self.matryoshka_candidates,
+                params = self.search_params(),
+            ),
+            "query": query,
+            "using": "full",
+        }
+
+    def prefetch(self, query: list[float], limit: int) -> models.Prefetch:
+        """The search for one query vector as a prefetch, so several can be fused in a single request"""
+        kwargs = self.query_kwargs(query, limit)
+        return models.Prefetch(
+            prefetch = kwargs.get("prefetch"),
+            query = kwargs["query"],
+            using = kwargs.get("using"),
+            params = kwargs.get("search_params"),
+            limit = limit,
+        )
+
+    def fused_query_kwargs(self, queries: list[list[float]], limit: int, sparse: models.SparseVector | None = None) -> dict:
+        """Query arguments that search every dense vector, and the keyword vector when given, in one
+        request and fuse the hits with reciprocal rank fusion"""
+        if not self.sparse:
+            sparse = None
+        if len(queries) == 1 and sparse is None:
+            return self.query_kwargs(queries[0], limit)
+
+        candidates = limit * self.fusion_candidates
+        prefetch = [self.prefetch(query, candidates) for query in queries]
+        if sparse is not None:
+            prefetch.append(models.Prefetch(query=sparse, using=SPARSE_VECTOR, limit=candidates))
+        return {
+            "prefetch": prefetch,
+            "query": models.FusionQuery(fusion=models.Fusion.RRF),
+        }
+
+    def hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self):
+        #? Quantized vectors stay in RAM for the candidate pass, originals can live on disk for rescoring
+        if self.quantization == "int8":
+            return models.ScalarQuantization(
+                scalar = models.ScalarQuantizationConfig(
+                    type = models.ScalarType.INT8,
+                    quantile = 0.99,
+                    always_ram = True,
+                ),
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(
+                binary = models.BinaryQuantizationConfig(always_ram=True),
+            )
+        return None
+
+    def search_params(self) -> models.SearchParams | None:
+        quantization = None
+        if self.quantization is not None:
+            quantization = models.QuantizationSearchParams(
+                rescore = self.rescore,
+                oversampling = self.oversampling,
+            )
+        if quantization is None and self.hnsw_ef is None:
+            return None
+        return models.SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+    def bytes_per_vector(self, size: int) -> dict:
+        """Estimated bytes per vector held in RAM and on disk under this profile"""
+        width = 2 if self.datatype == models.Datatype.FLOAT16 else 4
+        original = size * width
+        links = self.hnsw_m * 2 * 4
+        if self.matryoshka_dim:
+            small = self.matryoshka_dim * width
+            return {"ram": small + links, "disk": original + small + links}
+
+        quantized = {"int8": size, "binary": size // 8}.get(self.quantization, 0)
+        ram = quantized + links + (0 if self.on_disk else original)
+        return {"ram": ram, "disk": original + quantized + links}
+
+
+def truncate_vector(vector: list[float], dim: int) -> list[float]:
+    """Cut a Matryoshka embedding down to its first `dim` values and re-normalize it"""
+    head = vector[:dim]
+    norm = math.sqrt(sum(v * v for v in head)) or 1.0
+    return [v / norm for v in head]
+
+
+def full_vector(vector) -> list[float]:
+    """Return the full embedding of a point whether its collection uses named vectors or not"""
+    if isinstance(vector, dict):
+        return vector["full"] if "full" in vector else vector[""]
+    return vector
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in [
+        CollectionProfile("default"),
+        CollectionProfile("float16", datatype=models.Datatype.FLOAT16),
+        CollectionProfile("on_disk", on_disk=True, hnsw_ef=128),
+        CollectionProfile("int8", on_disk=True, quantization="int8", hnsw_m=16, hnsw_ef_construct=128, oversampling=2.0),
+        CollectionProfile("binary", on_disk=True, quantization="binary", hnsw_m=32, hnsw_ef_construct=256, hnsw_ef=128, oversampling=3.0),
+        CollectionProfile("matryoshka", matryoshka_dim=MATRYOSHKA_DIM, hnsw_ef=128),
+    ]
+}
+DEFAULT_PROFILE = os.environ.get("CVEC_COLLECTION_PROFILE", "default")
+
+
+def get_profile(name: str = DEFAULT_PROFILE) -> CollectionProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown collection profile {name!r}, available: {', '.join(PROFILES)}") from None
@@ -0,0 +1,130 @@
+import os
+import json
+import zlib
+import sqlite3
+import threading
+
+from pathlib import Path
+from typing import NamedTuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DOC_STORE_PATH = os.environ.get("CVEC_DOC_STORE", os.path.join(BASE_DIR, "data/doc_store/jobs.sqlite"))
+
+#* Fields the job cards and search filters need, these stay on every Qdrant point
+CARD_FIELDS = [
+    "companyName", "jobTitle", "jobkey", "jobLink", "jobType", "remoteWorkInfo",
+    "locationInfo", "salaryInfo", "subtitle", "highVolumeHiring", "urgentlyHiring",
+]
+#* Fields only needed once a user opens a job, these live in the document store
+DETAIL_FIELDS = [
+    "jobDescription", "companyImages", "companyReview", "companyOverviewLink", "companyReviewLink",
+]
+#* Payload fields a search returns, just what a job card shows, details load on demand
+SEARCH_FIELDS = CARD_FIELDS + ["descriptionPreview", "chunkText", "locations"]
+PREVIEW_CHARS = 300
+
+
+class JobDocument(NamedTuple):
+    jobkey: str
+    codec: str
+    body: bytes
+
+
+def compress(data: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+
+def decompress(codec: str, body: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ImportError("This document store was written with zstd, install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(body)
+    return zlib.decompress(body)
+
+
+def split_job(job: dict, **extra) -> tuple[dict, JobDocument]:
+    """Split a cleaned job into its slim point payload and its compressed detail document.
+
+    The document keeps a copy of the payload as the job's `card`, searches that hit a chunk
+    shared with other jobs read the card from here.
+    """
+    payload = {field: job.get(field) for field in CARD_FIELDS} | extra
+    details = {field: job.get(field) for field in DETAIL_FIELDS}
+    details["card"] = payload
+    codec, body = compress(json.dumps(details, ensure_ascii=False).encode("utf-8"))
+    return payload, JobDocument(job.get("jobkey"), codec, body)
+
+
+class DocStore:
+    """SQLite store of compressed job details keyed by jobkey"""
+
+    def __init__(self, path: str = DOC_STORE_PATH):
+        self.path = path
+        #? App sessions and search threads share this connection, one statement at a time
+        self.lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                jobkey TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                body BLOB NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def put_many(self, documents: list[JobDocument]):
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO jobs (jobkey, codec, body) VALUES (?, ?, ?)", documents)
+            self.conn.commit()
+
+    def get_many(self, jobkeys: list[str]) -> dict[str, dict]:
+        found = {}
+        for i in range(0, len(jobkeys), 500):
+            batch = jobkeys[i:i+500]
+            marks = ",".join("?" * len(batch))
+            with self.lock:
+                rows = self.conn.execute(f"SELECT jobkey, codec, body FROM jobs WHERE jobkey IN ({marks})", batch).fetchall()
+            for jobkey, codec, body in rows:
+                found[jobkey] = json.loads(decompress(codec, body))
+        return found
+
+    def get_cards(self, jobkeys: list[str]) -> dict[str, dict]:
+        return {jobkey: details["card"] for jobkey, details in self.get_many(jobkeys).items() if "card" in details}
+
+    def put_cards(self, cards: dict[str, dict]):
+        """Replace the card copy kept in each job's document"""
+        documents = []
+        for jobkey, details in self.get_many(list(cards)).items():
+            details["card"] = cards[jobkey]
+            documents.append(JobDocument(jobkey, *compress(json.dumps(details, ensure_ascii=False).encode("utf-8"))))
+        self.put_many(documents)
+
+    def get(self, jobkey: str) -> dict | None:
+        return self.get_many([jobkey]).get(jobkey)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_store = None
+
+
+def get_doc_store() -> DocStore:
+    """Return the process-wide document store, opening it on first use"""
+    global _store
+    if _store is None:
+        _store = DocStore()
+    return _store
@@ -0,0 +1,212 @@
+import os
+import re
+import math
+import getpass
+import asyncio
+import hashlib
+import weakref
+
+import httpx
+
+from openai import OpenAI
+
+from .embedding_client import EMBED_MAX_CONCURRENCY, AsyncEmbeddingClient
+
+
+DEFAULT_MODEL = os.environ.get("CVEC_EMBED_MODEL", "text-embedding-3-large")
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+
+
+class EmbeddingBackend:
+    """An embedding model plus the limits the ingestion pipeline has to respect when calling it"""
+
+    name: str
+    dimensions: int
+    max_batch_size: int = 256
+    max_tokens: int = 65_536
+    #? Longest single input the model accepts, longer ones must be truncated before embedding
+    max_input_tokens: int = 8_191
+    concurrency: int = 1
+    #? Matryoshka-trained models keep their meaning when truncated to a prefix of the vector
+    matryoshka: bool = False
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        raise NotImplementedError
+
+    async def aembed(self, texts: list[str], tokens: int | None = None) -> list[list[float]]:
+        return await asyncio.to_thread(self.embed, texts)
+
+    async def aclose(self):
+        """Close the async client of the running event loop, if the backend keeps one"""
+
+    def summary(self) -> dict:
+        return {}
+
+
+class OpenAIBackend(EmbeddingBackend):
+    max_batch_size = 2048
+    max_tokens = 300_000
+    concurrency = EMBED_MAX_CONCURRENCY
+    matryoshka = True
+
+    def __init__(self, name: str, dimensions: int):
+        self.name = name
+        self.dimensions = dimensions
+        self.client = None
+        #? Async clients hold loop-bound locks and connections, so keep one per event loop
+        self.async_clients = weakref.WeakKeyDictionary()
+        self.last_summary = {}
+
+    def get_client(self) -> OpenAI:
+        if self.client is None:
+            if not os.environ.get("OPENAI_API_KEY"):
+                os.environ["OPENAI_API_KEY"] = getpass.getpass("Please enter your OPENAI_API_KEY: ")
+            self.client = OpenAI(max_retries=5)
+        return self.client
+
+    def get_async_client(self) -> AsyncEmbeddingClient:
+        loop = asyncio.get_running_loop()
+        if loop not in self.async_clients:
+            self.get_client()
+            self.async_clients[loop] = AsyncEmbeddingClient(self.name, max_concurrency=self.concurrency)
+        return self.async_clients[loop]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        response = self.get_client().embeddings.create(input=texts, model=self.name)
+        return [i.embedding for i in response.data]
+
+    async def aembed(self, texts: list[str], tokens: int | None = None) -> list[list[float]]:
+        return await self.get_async_client().embed(texts, tokens)
+
+    async def aclose(self):
+        client = self.async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            #? The run's request stats are still reported once its client is gone
+            self.last_summary = client.summary()
+            await client.close()
+
+    def summary(self) -> dict:
+        summaries = [client.summary() for client in self.async_clients.values()]
+        return summaries[-1] if summaries else self.last_summary
+
+
+class OllamaBackend(EmbeddingBackend):
+    """Embeddings from a local Ollama-compatible server over pooled keep-alive connections"""
+
+    max_batch_size = 512
+    max_tokens = 131_072
+    max_input_tokens = 8_192
+    concurrency = 2
+
+    def __init__(self, name: str, dimensions: int, host: str = OLLAMA_HOST):
+        self.name = name
+        self.dimensions = dimensions
+        self.host = host.rstrip("/")
+        self.limits = httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=60)
+        self.client = None
+        self.async_clients = weakref.WeakKeyDictionary()
+
+    def get_client(self) -> httpx.Client:
+        if self.client is None:
+            self.client = httpx.Client(base_url=self.host, limits=self.limits, timeout=120)
+        return self.client
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if loop not in self.async_clients:
+            self.async_clients[loop] = httpx.AsyncClient(base_url=self.host, limits=self.limits, timeout=120)
+        return self.async_clients[loop]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        response = self.get_client().post("/api/embed", json={"model": self.name, "input": texts})
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+    async def aembed(self, texts: list[str], tokens: int | None = None) -> list[list[float]]:
+        response = await self.get_async_client().post("/api/embed", json={"model": self.name, "input": texts})
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+    async def aclose(self):
+        client = self.async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Offline CPU embeddings from a sentence-transformers model, loaded once per process"""
+
+    max_batch_size = 128
+    max_tokens = 65_536
+    #? sentence-transformers truncates inputs to the model's window itself
+    max_input_tokens = 10**9
+    concurrency = 1
+
+    def __init__(self, name: str, dimensions: int):
+        self.name = name
+        self.dimensions = dimensions
+        self.model = None
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        if self.model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(f"{self.name} needs the sentence-transformers package: pip install sentence-transformers") from e
+            self.model = SentenceTransformer(self.name, device="cpu")
+        return self.model.encode(texts, batch_size=32, normalize_embeddings=True).tolist()
+
+
+class HashingBackend(EmbeddingBackend):
+    """Deterministic feature-hashing embedder over word unigrams and bigrams.
+
+    Needs no model or network, so tests and air-gapped benchmarks can run the whole
+    ingest and search path. Similarity is purely lexical.
+    """
+
+    max_batch_size = 4096
+    max_tokens = 10**9
+    max_input_tokens = 10**9
+    concurrency = 1
+
+    def __init__(self, name: str = "local-hashing", dimensions: int = 768):
+        self.name = name
+        self.dimensions = dimensions
+
+    def embed_one(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        words = re.findall(r"\w+", text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_one(text) for text in texts]
+
+
+BACKENDS: dict[str, EmbeddingBackend] = {}
+
+
+def register_backend(backend: EmbeddingBackend):
+    BACKENDS[backend.name] = backend
+
+
+def get_backend(model_name: str = DEFAULT_MODEL) -> EmbeddingBackend:
+    try:
+        return BACKENDS[model_name]
+    except KeyError:
+        raise ValueError(f"Unknown embedding model {model_name!r}, registered: {', '.join(BACKENDS)}") from None
+
+
+async def close_async_clients():
+    """Close every backend's async client of the running event loop, for loops that end with the run"""
+    for backend in BACKENDS.values():
+        await backend.aclose()
+
+
+register_backend(OpenAIBackend("text-embedding-3-large", 3072))
+register_backend(OllamaBackend("nomic-embed-text", 768))
+register_backend(SentenceTransformerBackend("all-MiniLM-L6-v2", 384))
+register_backend(HashingBackend("local-hashing", 768))
@@ -0,0 +1,37 @@
+from typing import Iterable, Iterator, NamedTuple
+from qdrant_client import models
+
+from .embedding_backends import get_backend
+
+
+#? Stay a little under the hard token limit, our counts come from cl100k_base and can drift from the server's
+TOKEN_HEADROOM = 0.95
+
+
+class PendingChunk(NamedTuple):
+    """A chunk that has been cut from a document but not embedded yet"""
+    id: str
+    text: str
+    tokens: int
+    payload: dict
+    sparse: models.SparseVector | None = None
+
+
+def pack_batches(chunks: Iterable[PendingChunk], model_name: str) -> Iterator[list[PendingChunk]]:
+    """Greedily pack chunks from many documents into requests filled up to the provider limits"""
+    backend = get_backend(model_name)
+    max_inputs = backend.max_batch_size
+    max_tokens = int(backend.max_tokens * TOKEN_HEADROOM)
+
+    batch = []
+    batch_tokens = 0
+    for chunk in chunks:
+        if batch and (len(batch) >= max_inputs or batch_tokens + chunk.tokens > max_tokens):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(chunk)
+        batch_tokens += chunk.tokens
+
+    if batch:
+        yield batch
@@ -0,0 +1,150 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+from array import array
+from pathlib import Path
+from loguru import logger
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+CACHE_PATH = os.environ.get("CVEC_EMBED_CACHE", os.path.join(BASE_DIR, "data/cache/embeddings.sqlite"))
+CACHE_MAX_BYTES = int(os.environ.get("CVEC_EMBED_CACHE_MAX_BYTES", 2 * 1024**3))
+
+
+def normalize_text(text: str) -> str:
+    """Return the text with unicode and whitespace differences folded away"""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def cache_key(model_name: str, dimensions: int, text: str) -> str:
+    raw = f"{model_name}\x1f{dimensions}\x1f{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent SQLite cache of embeddings keyed by (model, dimensions, text hash).
+
+    Rows carry their byte size and last access time, so the cache can evict the
+    least recently used vectors once it grows past `max_bytes`.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        #? Concurrent sessions share one connection, every statement runs under this (reentrant, put_many evicts inside it) lock
+        self.lock = threading.RLock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        #? Another process on the same cache file opens its own connection, WAL lets it read while this one writes
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dims INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_accessed ON embeddings(accessed)")
+        self.conn.commit()
+
+    def get_many(self, model_name: str, dimensions: int, texts: list[str]) -> list[list[float] | None]:
+        """Return the cached vector for every text, or None where it is missing"""
+        keys = [cache_key(model_name, dimensions, text) for text in texts]
+        found = {}
+
+        #? SQLite caps the number of bound parameters, so look the keys up in slices
+        unique_keys = list(dict.fromkeys(keys))
+        with self.lock:
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i+500]
+                marks = ",".join("?" * len(batch))
+                rows = self.conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET accessed = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self.conn.commit()
+
+            vectors = [found.get(key) for key in keys]
+            hits = sum(vector is not None for vector in vectors)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model_name: str, dimensions: int, texts: list[str], vectors: list[list[float]]):
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = array("f", vector).tobytes()
+            rows.append((cache_key(model_name, dimensions, text), model_name, dimensions, blob, len(blob), now))
+
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dims, vector, size, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.commit()
+            self.evict()
+
+    def size(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def evict(self):
+        """Drop the least recently used vectors until the cache is back under 90% of max_bytes"""
+        with self.lock:
+            total = self.size()
+            if total <= self.max_bytes:
+                return
+
+            target = int(self.max_bytes * 0.9)
+            freed = 0
+            stale_keys = []
+            for key, size in self.conn.execute("SELECT key, size FROM embeddings ORDER BY accessed ASC"):
+                if total - freed <= target:
+                    break
+                stale_keys.append((key,))
+                freed += size
+
+            self.conn.executemany("DELETE FROM embeddings WHERE key = ?", stale_keys)
+            self.conn.commit()
+        logger.info(f"Embedding cache evicted {len(stale_keys)} vectors ({freed / 1024**2:.1f} MiB)")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_cache = None
+
+
+def get_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, opening it on first use"""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache()
+    return _cache
@@ -0,0 +1,207 @@
+import os
+import time
+import random
+import asyncio
+import statistics
+
+from typing import NamedTuple
+from loguru import logger
+from openai import (
+    AsyncOpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+
+#* Account quota for the embedding model, override per deployment
+EMBED_RPM = int(os.environ.get("CVEC_EMBED_RPM", 3000))
+EMBED_TPM = int(os.environ.get("CVEC_EMBED_TPM", 1_000_000))
+EMBED_MAX_CONCURRENCY = int(os.environ.get("CVEC_EMBED_MAX_CONCURRENCY", 4))
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+class BatchMetric(NamedTuple):
+    inputs: int
+    tokens: int
+    latency: float
+    attempts: int
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute` units per minute"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount: int = 1):
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that grows additively on success and halves when the API throttles us"""
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc):
+        async with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self):
+        self.limit = max(self.min_limit, self.limit / 2)
+
+
+class CircuitBreaker:
+    """Stop sending requests for `reset_timeout` seconds after `failure_threshold` consecutive failures"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    def remaining(self) -> float:
+        """Seconds until the breaker lets a probe request through, 0 when closed or half-open"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Embedding circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+
+class AsyncEmbeddingClient:
+    """Shared AsyncOpenAI embedding client scheduled against the account's RPM and TPM quota.
+
+    Every request first takes one unit from the request bucket and its token count from
+    the token bucket, then runs under an adaptive concurrency limit. Retryable errors are
+    retried with jittered exponential backoff, and a circuit breaker holds all requests
+    back while the API keeps failing.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "text-embedding-3-large",
+        rpm: int = EMBED_RPM,
+        tpm: int = EMBED_TPM,
+        max_concurrency: int = EMBED_MAX_CONCURRENCY,
+        max_retries: int = 6,
+        base_url: str | None = None,
+        api_key: str | None = None,
+    ):
+        self.model_name = model_name
+        self.max_retries = max_retries
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, max_retries=0)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.breaker = CircuitBreaker()
+        self.metrics: list[BatchMetric] = []
+
+    async def embed(self, texts: list[str], tokens: int | None = None) -> list[list[float]]:
+        if tokens is None:
+            tokens = sum(len(text) // 4 + 1 for text in texts)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            #? While the breaker is open, wait it out instead of adding to the failing traffic
+            wait = self.breaker.remaining()
+            if wait:
+                await asyncio.sleep(wait)
+
+            await self.requests.acquire(1)
+            await self.tokens.acquire(tokens)
+
+            async with self.limiter:
+                start = time.perf_counter()
+                try:
+                    response = await self.client.embeddings.create(input=texts, model=self.model_name)
+                    error = None
+                except RETRYABLE_ERRORS as e:
+                    error = e
+
+            if error is None:
+                self.breaker.record_success()
+                self.limiter.on_success()
+                self.metrics.append(BatchMetric(len(texts), tokens, time.perf_counter() - start, attempt))
+                return [item.embedding for item in response.data]
+
+            self.breaker.record_failure()
+            if isinstance(error, RateLimitError):
+                self.limiter.on_throttle()
+            if attempt >= self.max_retries:
+                raise error
+
+            #? Back off outside the limiter so a sleeping retry does not hold a concurrency slot
+            delay = self.backoff(attempt, error)
+            logger.warning(f"Embedding request failed ({type(error).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def backoff(attempt: int, error: Exception, base: float = 1.0, cap: float = 60.0) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After when it sends one"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after) + random.uniform(0, 1)
+            except ValueError:
+                pass
+        return random.uniform(0, min(cap, base * 2 ** attempt))
+
+    def summary(self) -> dict:
+        """Per-batch latency and retry statistics for the requests sent so far"""
+        if not self.metrics:
+            return {"batches": 0}
+        latencies = sorted(m.latency for m in self.metrics)
+        return {
+            "batches": len(self.metrics),
+            "inputs": sum(m.inputs for m in self.metrics),
+            "tokens": sum(m.tokens for m in self.metrics),
+            "retries": sum(m.attempts - 1 for m in self.metrics),
+            "latency_mean": statistics.fmean(latencies),
+            "latency_p50": latencies[len(latencies) // 2],
+            "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            "concurrency": self.limiter.limit,
+        }
+
+    async def close(self):
+        await self.client.close()
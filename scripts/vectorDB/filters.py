@@ -0,0 +1,118 @@
+import unicodedata
+
+from qdrant_client import QdrantClient, models
+
+
+#* Filter inputs from the Career Vector page -> normalized payload keys they match on
+FILTER_KEYS = {
+    "filter_job_type": "filters.jobType",
+    "filter_state": "filters.state",
+    "filter_city": "filters.city",
+}
+#* Where each normalized key comes from in the job payload
+SOURCE_FIELDS = {
+    "jobType": ("jobType",),
+    "state": ("locationInfo", "jobLocationState"),
+    "city": ("locationInfo", "jobLocationCity"),
+}
+#* Other payload fields we filter or group on
+KEYWORD_FIELDS = ["jobkey"]
+#* Flags set on shared chunks, see chunk_store
+BOOL_FIELDS = ["boilerplate"]
+
+CITY_ALIASES = {
+    "bay area": "san francisco bay area",
+    "sf bay area": "san francisco bay area",
+    "sf": "san francisco",
+    "nyc": "new york",
+    "new york city": "new york",
+    "la": "los angeles",
+    "dc": "washington",
+    "washington dc": "washington",
+}
+STATE_ALIASES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "district of columbia": "dc",
+    "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il",
+    "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la",
+    "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny",
+    "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or",
+    "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc", "south dakota": "sd",
+    "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va",
+    "washington": "wa", "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+}
+ALIASES = {"city": CITY_ALIASES, "state": STATE_ALIASES}
+
+
+def normalize_value(field: str, value: str | None) -> str | None:
+    """Case-fold a filter value, collapse punctuation and whitespace, and resolve known aliases"""
+    if not value:
+        return None
+    value = unicodedata.normalize("NFKC", str(value)).casefold()
+    #? Drop periods so "D.C." and "DC" match, commas separate words
+    value = " ".join(value.replace(".", "").replace(",", " ").split())
+    if not value:
+        return None
+    return ALIASES.get(field, {}).get(value, value)
+
+
+def normalized_filter_dict(filter_dict: dict) -> dict:
+    """Return the Career Vector page's filter inputs normalized the way they match at ingest, dropping empty ones"""
+    normalized = {}
+    for key, value in filter_dict.items():
+        search_key = FILTER_KEYS.get(key)
+        if search_key is None:
+            continue
+        value = normalize_value(search_key.split(".")[-1], value)
+        if value is not None:
+            normalized[key] = value
+    return normalized
+
+
+def matches_filters(filters: dict, filter_dict: dict) -> bool:
+    """Check a job's normalized `filters` against the page's filter inputs, the way search_filter matches a point"""
+    for key, value in normalized_filter_dict(filter_dict).items():
+        stored = filters.get(FILTER_KEYS[key].split(".")[-1])
+        #? Merged near-duplicates store a list of values, any of them matches
+        if value != stored and not (isinstance(stored, list) and value in stored):
+            return False
+    return True
+
+
+def union_filters(cards: list[dict]) -> dict:
+    """Every normalized filter value of several jobs' cards, so a point standing for all of them matches any"""
+    filters = {}
+    for field in SOURCE_FIELDS:
+        values = []
+        for card in cards:
+            value = (card.get("filters") or {}).get(field)
+            values.extend(value if isinstance(value, list) else [value])
+        filters[field] = list(dict.fromkeys(value for value in values if value is not None))
+    return filters
+
+
+def normalized_filters(job: dict) -> dict:
+    """Return the normalized copies of a job's filterable fields, stored on its points under `filters`"""
+    filters = {}
+    for field, path in SOURCE_FIELDS.items():
+        value = job
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        filters[field] = normalize_value(field, value)
+    return filters
+
+
+def ensure_payload_indexes(client: QdrantClient, collection: str):
+    """Create keyword payload indexes for every filter key so filtered HNSW search stays fast"""
+    fields = {field: models.PayloadSchemaType.KEYWORD for field in list(FILTER_KEYS.values()) + KEYWORD_FIELDS}
+    fields.update({field: models.PayloadSchemaType.BOOL for field in BOOL_FIELDS})
+    existing = client.get_collection(collection).payload_schema or {}
+    for field, schema in fields.items():
+        if field not in existing:
+            client.create_payload_index(
+                collection_name = collection,
+                field_name = field,
+                field_schema = schema,
+            )
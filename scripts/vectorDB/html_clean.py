@@ -0,0 +1,110 @@
+import re
+
+from html import escape
+from bs4 import BeautifulSoup, Tag
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+
+#* Elements removed from descriptions together with everything inside them
+DROP_TAGS = (
+    "script", "style", "iframe", "frame", "frameset", "object", "embed", "applet", "noscript", "template",
+    "form", "button", "input", "select", "textarea", "svg", "math", "head", "title", "meta", "link", "base",
+)
+#* Elements kept in the display HTML, any other element is unwrapped and only its content stays
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "caption", "cite", "code", "dd", "del", "div", "dl", "dt", "em",
+    "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "ins", "li", "ol", "p", "pre", "q", "s", "small",
+    "span", "strong", "sub", "sup", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "u", "ul",
+}
+#* Attributes kept on allowed elements, namespaced ones like xlink:href never are
+ALLOWED_ATTRIBUTES = {"href", "src", "alt", "title", "colspan", "rowspan", "start"}
+URL_ATTRIBUTES = {"href", "src"}
+URL_SCHEMES = {"http", "https", "mailto"}
+#? Browsers skip control characters and spaces inside a URL, "java\tscript:" still runs
+URL_IGNORED = re.compile(r"[\x00-\x20\x7f]+")
+URL_SCHEME = re.compile(r"([a-z][a-z0-9+.-]*):")
+
+
+def clean_description_bs4(html: str) -> tuple[str, str]:
+    """The original BeautifulSoup path, kept as the baseline of benchmark_html_clean"""
+    soup = BeautifulSoup(html, "html.parser")
+
+    for br in soup.find_all("br"):
+        while isinstance(br.next_sibling, Tag) and br.next_sibling.name == "br":
+            br.next_sibling.extract()
+
+    return soup.prettify(), soup.get_text(separator="\n", strip=True)
+
+
+def safe_url(value: str) -> bool:
+    """Relative URLs and http, https and mailto links are safe, every other scheme is not"""
+    match = URL_SCHEME.match(URL_IGNORED.sub("", value).lower())
+    return match is None or match.group(1) in URL_SCHEMES
+
+
+def clean_attributes(el):
+    """Remove every attribute off the allow-list, and URLs with an unsafe scheme"""
+    for name in list(el.attrib):
+        if name not in ALLOWED_ATTRIBUTES or (name in URL_ATTRIBUTES and not safe_url(el.attrib[name])):
+            del el.attrib[name]
+
+
+def text_only(html: str) -> tuple[str, str]:
+    """Escaped plain text as the display HTML, for descriptions that cannot be sanitized"""
+    text = clean_description_bs4(html)[1]
+    return "<br>".join(escape(line) for line in text.split("\n")), text
+
+
+def clean_description(html: str) -> tuple[str, str]:
+    """Return a job description's sanitized display HTML and its plain text from a single parse.
+
+    Scripts, embeds and form controls are dropped, elements and attributes off the
+    allow-lists are removed, links may only use http, https or mailto, and runs of
+    back-to-back <br> tags collapse into one. The plain text matches BeautifulSoup's
+    get_text(separator="\\n", strip=True).
+    """
+    if lxml_html is None:
+        return text_only(html)
+    if not html or not html.strip():
+        return "", ""
+
+    try:
+        root = lxml_html.fragment_fromstring(html, create_parent="div")
+    except (etree.ParserError, ValueError):
+        return text_only(html)
+
+    #? A dropped element still separates the text around it, like BeautifulSoup's separator does
+    for el in root.iter(etree.Comment, etree.ProcessingInstruction, *DROP_TAGS):
+        if el.tail:
+            el.tail = "\n" + el.tail
+    #? strip_elements runs in C, the tails are kept so text after a dropped element survives
+    etree.strip_elements(root, etree.Comment, etree.ProcessingInstruction, *DROP_TAGS, with_tail=False)
+
+    extra_breaks = []
+    unwrap = []
+    for el in root.iter():
+        clean_attributes(el)
+        if el is not root and el.tag not in ALLOWED_TAGS:
+            unwrap.append(el)
+
+        if el.tag == "br" and not el.tail:
+            nxt = el.getnext()
+            if nxt is not None and nxt.tag == "br":
+                extra_breaks.append(nxt)
+
+    #? Text is read before unwrapping, which would glue an element's text onto its neighbours
+    text = "\n".join(s for s in (piece.strip() for piece in root.itertext()) if s)
+
+    for br in extra_breaks:
+        br.drop_tree()
+    #? Unknown elements keep their text and children, only their own tags go
+    for el in unwrap:
+        el.drop_tag()
+
+    #? Serialize the wrapper and cut its own tags off, lxml escapes the loose text for us
+    display = lxml_html.tostring(root, encoding="unicode")[len("<div>"):-len("</div>")]
+    return display, text
@@ -0,0 +1,194 @@
+import queue
+import asyncio
+import threading
+
+from typing import Callable, Iterable, Iterator
+from loguru import logger
+
+
+DONE = object()
+QUEUE_TIMEOUT = 0.5
+
+
+class PipelineError(RuntimeError):
+    pass
+
+
+def put(q: queue.Queue, item, stop: threading.Event):
+    """Block until the queue has room for the item, giving up once the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=QUEUE_TIMEOUT)
+            return
+        except queue.Full:
+            continue
+    raise PipelineError("Pipeline stopped")
+
+
+class Stage(threading.Thread):
+    """Pull items off an inbox queue, apply func, and push non-empty results to the outbox.
+
+    The queues are bounded, so a slow stage blocks the stages feeding it instead of
+    letting work pile up in memory.
+    """
+
+    def __init__(self, name: str, func: Callable, inbox: queue.Queue, outbox: queue.Queue | None, stop: threading.Event):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop = stop
+        self.error = None
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                try:
+                    item = self.inbox.get(timeout=QUEUE_TIMEOUT)
+                except queue.Empty:
+                    continue
+                if item is DONE:
+                    break
+
+                result = self.func(item)
+                if self.outbox is not None and result:
+                    put(self.outbox, result, self.stop)
+
+        except PipelineError:
+            #? Another stage failed and stopped the pipeline, that stage holds the real error
+            pass
+
+        except Exception as e:
+            logger.error(f"Stage {self.name} failed: {e}")
+            self.error = e
+            self.stop.set()
+
+        finally:
+            if self.outbox is not None and not self.stop.is_set():
+                put(self.outbox, DONE, self.stop)
+
+
+class AsyncStage(Stage):
+    """Stage whose func is a coroutine, with up to `concurrency` items in flight on the stage's own event loop.
+
+    `on_close` is awaited on that loop when the stage ends, to close clients bound to it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        inbox: queue.Queue,
+        outbox: queue.Queue | None,
+        stop: threading.Event,
+        concurrency: int = 8,
+        on_close: Callable | None = None,
+    ):
+        super().__init__(name, func, inbox, outbox, stop)
+        self.concurrency = concurrency
+        self.on_close = on_close
+
+    def run(self):
+        try:
+            asyncio.run(self.main())
+
+        except PipelineError:
+            pass
+
+        except Exception as e:
+            logger.error(f"Stage {self.name} failed: {e}")
+            self.error = e
+            self.stop.set()
+
+        finally:
+            if self.outbox is not None and not self.stop.is_set():
+                put(self.outbox, DONE, self.stop)
+
+    async def main(self):
+        try:
+            await self.serve()
+        finally:
+            if self.on_close is not None:
+                await self.on_close()
+
+    def next_item(self):
+        """Blocking inbox read for the executor, None when nothing arrived before the timeout"""
+        try:
+            return self.inbox.get(timeout=QUEUE_TIMEOUT)
+        except queue.Empty:
+            return None
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        async def handle(item):
+            try:
+                result = await self.func(item)
+                if self.outbox is not None and result:
+                    await loop.run_in_executor(None, put, self.outbox, result, self.stop)
+            finally:
+                slots.release()
+
+        while not self.stop.is_set():
+            await slots.acquire()
+            item = None
+            while item is None and not self.stop.is_set():
+                item = await loop.run_in_executor(None, self.next_item)
+            if item is None or item is DONE:
+                slots.release()
+                break
+
+            tasks.add(asyncio.create_task(handle(item)))
+
+            #? Surface a failed item right away instead of after the whole inbox is drained
+            for done in [t for t in tasks if t.done()]:
+                tasks.discard(done)
+                done.result()
+
+        await asyncio.gather(*tasks)
+
+
+def bounded_imap_unordered(pool, func: Callable, iterable: Iterable, max_in_flight: int, check: Callable | None = None) -> Iterator:
+    """Like Pool.imap_unordered, but only pulls a new input once fewer than max_in_flight are pending.
+
+    Pool.imap drains its whole input iterator up front, which defeats streaming. Failed
+    tasks are logged and skipped so that one bad document does not stop the run. While
+    waiting for results `check` is called every QUEUE_TIMEOUT, it raises if the pool is broken.
+    """
+    results = queue.Queue()
+    in_flight = 0
+
+    def take():
+        while True:
+            try:
+                ok, value = results.get(timeout=QUEUE_TIMEOUT)
+                break
+            except queue.Empty:
+                if check is not None:
+                    check()
+        if ok:
+            return value
+        logger.error(f"Task failed: {value}")
+        return None
+
+    for item in iterable:
+        while in_flight >= max_in_flight:
+            result = take()
+            in_flight -= 1
+            if result is not None:
+                yield result
+
+        pool.apply_async(
+            func, (item,),
+            callback = lambda value: results.put((True, value)),
+            error_callback = lambda e: results.put((False, e)),
+        )
+        in_flight += 1
+
+    while in_flight:
+        result = take()
+        in_flight -= 1
+        if result is not None:
+            yield result
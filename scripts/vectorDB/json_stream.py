@@ -0,0 +1,94 @@
+import re
+import json
+
+from typing import Iterator
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+READ_SIZE = 1 << 20
+#? Complete strings are skipped whole so brackets inside them are ignored, a lone quote means
+#? the string runs past the end of the buffer and we need to read more
+TOKENS = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|"|[\[\]{}]')
+
+
+def loads(raw: bytes):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def iter_array_records(f, read_size: int = READ_SIZE) -> Iterator[bytes]:
+    """Yield the raw bytes of each object in a top-level JSON array without parsing it.
+
+    Only string and bracket tokens are scanned (by the regex engine, not per byte in
+    Python), and bytes are dropped as soon as their record is yielded, so memory stays
+    at about one record plus one read however large the file is.
+    """
+    buf = b""
+    pos = 0
+    depth = 0
+    start = None
+    eof = False
+
+    while not eof:
+        data = f.read(read_size)
+        eof = not data
+        buf += data
+
+        for m in TOKENS.finditer(buf, pos):
+            token = m.group()
+            if token == b'"':
+                if eof:
+                    raise ValueError("Unterminated string at the end of the JSON file")
+                break
+            pos = m.end()
+            if token[0] == ord('"'):
+                continue
+
+            if token in (b"[", b"{"):
+                if depth == 0 and token != b"[":
+                    raise ValueError("Expected a JSON array of records")
+                if depth == 1:
+                    start = m.start()
+                depth += 1
+
+            else:
+                depth -= 1
+                if depth == 1 and start is not None:
+                    yield buf[start:pos]
+                    start = None
+                elif depth == 0:
+                    return
+
+        #? Keep only the unfinished record, or nothing between records
+        keep = start if start is not None else pos
+        buf = buf[keep:]
+        pos -= keep
+        if start is not None:
+            start = 0
+
+    if depth:
+        raise ValueError("The JSON array ends before it is closed")
+
+
+def iter_lines_records(f) -> Iterator[bytes]:
+    """Yield each non-empty line of a JSON Lines file"""
+    for line in f:
+        if line.strip():
+            yield line
+
+
+def iter_records(path: str, read_size: int = READ_SIZE) -> Iterator[bytes]:
+    """Yield raw job records from a JSON array file or a JSON Lines file, one at a time"""
+    with open(path, "rb") as f:
+        if path.endswith(".jsonl"):
+            yield from iter_lines_records(f)
+        else:
+            yield from iter_array_records(f, read_size)
+
+
+def iter_jobs(path: str, read_size: int = READ_SIZE) -> Iterator[dict]:
+    for raw in iter_records(path, read_size):
+        yield loads(raw)
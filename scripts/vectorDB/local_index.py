@@ -0,0 +1,205 @@
+import os
+import json
+import mmap
+
+import numpy as np
+
+from pathlib import Path
+from loguru import logger
+from typing import Iterable
+from qdrant_client import QdrantClient, models
+
+from .chunk_store import is_shared
+from .collection_profiles import full_vector
+from .doc_store import SEARCH_FIELDS, get_doc_store
+from .filters import BOOL_FIELDS, FILTER_KEYS, KEYWORD_FIELDS
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+LOCAL_INDEX_DIR = os.environ.get("CVEC_LOCAL_INDEX_DIR", os.path.join(BASE_DIR, "data/local_index"))
+#* Payload keys that get a code column, so filters on them become boolean masks
+COLUMNS = list(FILTER_KEYS.values()) + KEYWORD_FIELDS + BOOL_FIELDS
+#? Rows scored per matmul, bounds the float32 copy made of a float16 memmap
+BLOCK_ROWS = 65_536
+
+
+def payload_value(payload: dict, key: str):
+    value = payload
+    for part in key.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def write_local_index(path: str, points: Iterable[tuple], dtype: str = "float16"):
+    """Write (id, vector, payload) points as a local index directory.
+
+    Points are stored grouped by jobkey, so a job's chunks are one contiguous segment
+    and per-job max scores are a single reduceat. Vectors are L2-normalized so a dot
+    product is the cosine score, and only the search fields are kept from payloads.
+    A chunk shared by several jobs is copied into each of their segments with that
+    job's card from the document store.
+    """
+    jobs = {}
+    shared = []
+    for point_id, vector, payload in points:
+        if is_shared(payload):
+            shared.append((point_id, vector, payload))
+        else:
+            jobs.setdefault(payload.get("jobkey"), []).append((point_id, vector, payload))
+
+    cards = get_doc_store().get_cards(list({jobkey for _, _, payload in shared for jobkey in payload["jobkey"]}))
+    for point_id, vector, payload in shared:
+        for jobkey in payload["jobkey"]:
+            if jobkey in cards:
+                copy = {**cards[jobkey], "chunkText": payload.get("chunkText"), "boilerplate": payload.get("boilerplate")}
+                jobs.setdefault(jobkey, []).append((point_id, vector, copy))
+    rows = [point for chunks in jobs.values() for point in chunks]
+
+    os.makedirs(path, exist_ok=True)
+    vectors = np.asarray([vector for _, vector, _ in rows], dtype=np.float32).reshape(len(rows), -1)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    np.save(os.path.join(path, "vectors.npy"), vectors.astype(dtype))
+
+    vocabularies = {column: {} for column in COLUMNS}
+    codes = {column: np.full(len(rows), -1, dtype=np.int32) for column in COLUMNS}
+    #? Merged near-duplicate jobs hold lists of values, those rows go to (row, code) side columns
+    extra = {column: [] for column in COLUMNS}
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    with open(os.path.join(path, "payloads.jsonl"), "wb") as f:
+        for i, (_, _, payload) in enumerate(rows):
+            for column in COLUMNS:
+                value = payload_value(payload, column)
+                if isinstance(value, list):
+                    extra[column].extend((i, vocabularies[column].setdefault(v, len(vocabularies[column]))) for v in value)
+                elif value is not None:
+                    codes[column][i] = vocabularies[column].setdefault(value, len(vocabularies[column]))
+            line = json.dumps({field: payload.get(field) for field in SEARCH_FIELDS}, ensure_ascii=False).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets[i + 1] = offsets[i] + len(line)
+
+    sizes = [len(chunks) for chunks in jobs.values()]
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64) if sizes else np.zeros(0, dtype=np.int64)
+    np.savez(
+        os.path.join(path, "columns.npz"),
+        starts = starts,
+        offsets = offsets,
+        **{f"code:{c}": codes[c] for c in COLUMNS},
+        **{f"extra:{c}": np.asarray(extra[c], dtype=np.int64).reshape(-1, 2) for c in COLUMNS},
+    )
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"ids": [point_id for point_id, _, _ in rows], "vocabularies": {c: list(v) for c, v in vocabularies.items()}}, f)
+    logger.info(f"Wrote local index with {len(rows)} chunks of {len(sizes)} jobs to {path}")
+
+
+def export_collection(client: QdrantClient, collection: str, path: str | None = None, dtype: str = "float16", batch_size: int = 512):
+    """Snapshot a Qdrant collection into a local index, using each point's full dense vector"""
+    def scroll():
+        offset = None
+        while True:
+            points, offset = client.scroll(collection, limit=batch_size, offset=offset, with_vectors=True, with_payload=True)
+            for p in points:
+                yield p.id, full_vector(p.vector), p.payload
+            if offset is None:
+                break
+
+    write_local_index(path or os.path.join(LOCAL_INDEX_DIR, collection), scroll(), dtype)
+
+
+class LocalIndex:
+    """In-process exact search over a memory-mapped vector matrix, grouped by jobkey"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        columns = np.load(os.path.join(path, "columns.npz"))
+        self.starts = columns["starts"]
+        self.ends = np.append(self.starts[1:], len(self.vectors))
+        self.offsets = columns["offsets"]
+        self.codes = {column: columns[f"code:{column}"] for column in COLUMNS}
+        self.extra = {column: columns[f"extra:{column}"] for column in COLUMNS}
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.ids = meta["ids"]
+        self.vocabularies = {column: {value: code for code, value in enumerate(values)} for column, values in meta["vocabularies"].items()}
+        self.masks = {}
+        #? Slicing a read-only mmap is safe from many threads, unlike seek + read on one file handle
+        with open(os.path.join(path, "payloads.jsonl"), "rb") as f:
+            self.payloads = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b""
+
+    def value_mask(self, column: str, value) -> np.ndarray:
+        """Boolean row mask of one filter value, built once and reused by later searches"""
+        key = (column, value)
+        if key not in self.masks:
+            code = self.vocabularies[column].get(value, -2)
+            mask = self.codes[column] == code
+            extra = self.extra[column]
+            mask[extra[extra[:, 1] == code, 0]] = True
+            self.masks[key] = mask
+        return self.masks[key]
+
+    def filter_mask(self, query_filter: models.Filter | None) -> np.ndarray | None:
+        """Evaluate the `must` and `must_not` keyword matches search_filter produces, anything else is rejected"""
+        if query_filter is None:
+            return None
+        mask = None
+        conditions = [(condition, False) for condition in query_filter.must or []] + [(condition, True) for condition in query_filter.must_not or []]
+        for condition, negate in conditions:
+            if not isinstance(condition, models.FieldCondition) or not isinstance(condition.match, models.MatchValue) or condition.key not in self.codes:
+                raise ValueError(f"The local index only supports keyword matches on {', '.join(COLUMNS)}")
+            value_mask = self.value_mask(condition.key, condition.match.value)
+            if negate:
+                value_mask = ~value_mask
+            mask = value_mask if mask is None else mask & value_mask
+        return mask
+
+    def scores(self, queries: list[list[float]]) -> np.ndarray:
+        """Cosine score of every chunk, the best over all query vectors"""
+        q = np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)
+        q /= np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+        scores = np.empty(len(self.vectors), dtype=np.float32)
+        for start in range(0, len(self.vectors), BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start+BLOCK_ROWS], dtype=np.float32)
+            scores[start:start+len(block)] = (block @ q.T).max(axis=1)
+        return scores
+
+    def payload(self, row: int) -> dict:
+        return json.loads(self.payloads[self.offsets[row]:self.offsets[row + 1]])
+
+    def search(self, queries: list[list[float]], query_filter: models.Filter | None, limit: int) -> list[models.ScoredPoint]:
+        """Top `limit` jobs by their best chunk, each returned as that chunk's point like query_points_groups"""
+        if not len(self.starts):
+            return []
+        scores = self.scores(queries)
+        mask = self.filter_mask(query_filter)
+        if mask is not None:
+            scores[~mask] = -np.inf
+
+        job_best = np.maximum.reduceat(scores, self.starts)
+        k = min(limit, int(np.isfinite(job_best).sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-job_best, k - 1)[:k]
+        top = top[np.argsort(-job_best[top], kind="stable")]
+
+        results = []
+        for job in top:
+            row = self.starts[job] + int(np.argmax(scores[self.starts[job]:self.ends[job]]))
+            results.append(models.ScoredPoint(id=self.ids[row], version=0, score=float(scores[row]), payload=self.payload(row)))
+        return results
+
+
+_indexes = {}
+
+
+def get_local_index(collection: str) -> LocalIndex:
+    """Return the opened local index of a collection, loading it on first use"""
+    if collection not in _indexes:
+        _indexes[collection] = LocalIndex(os.path.join(LOCAL_INDEX_DIR, collection))
+    return _indexes[collection]
+
+
+if __name__ == "__main__":
+    from .qdrant_clients import get_client
+
+    collection = "ds_jobs"
+    export_collection(get_client(), collection)
@@ -0,0 +1,154 @@
+import os
+import re
+import zlib
+import sqlite3
+import hashlib
+
+import numpy as np
+
+from loguru import logger
+from itertools import groupby
+from qdrant_client import QdrantClient, models
+
+from .filters import union_filters
+from .doc_store import get_doc_store
+
+
+NUM_PERM = 128
+#? 16 bands of 8 rows put the LSH candidate threshold near 0.7 Jaccard, candidates are then checked exactly
+BANDS = 16
+SHINGLE_WORDS = 5
+DUPLICATE_THRESHOLD = float(os.environ.get("CVEC_DUPLICATE_THRESHOLD", 0.85))
+
+_rng = np.random.default_rng(20240601)
+#? Multiply-shift hashing: odd multipliers, 64-bit wraparound, keep the high 32 bits
+PERM_A = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+PERM_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+WORD = re.compile(r"\w+")
+
+
+def minhash(text: str) -> np.ndarray | None:
+    """MinHash signature of a description's word 5-shingles, None when it has no words"""
+    words = WORD.findall(text.lower())
+    if not words:
+        return None
+    n = max(1, len(words) - SHINGLE_WORDS + 1)
+    shingles = {zlib.crc32(" ".join(words[i:i+SHINGLE_WORDS]).encode("utf-8")) for i in range(n)}
+    hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(PERM_A, hashes) + PERM_B[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(a == b))
+
+
+class DuplicateIndex:
+    """LSH buckets over MinHash signatures, the first job seen in a cluster becomes its canonical copy.
+
+    Candidates must also come from the same company, so shared boilerplate between
+    employers never merges two different jobs. Signatures and buckets are kept in SQLite
+    rather than dicts, a national crawl has millions of them.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.rows = NUM_PERM // BANDS
+        #? SQLite's unnamed temporary database, paged out to a file once it outgrows its cache
+        self.conn = sqlite3.connect("")
+        self.conn.execute("CREATE TABLE signatures (id INTEGER PRIMARY KEY, jobkey TEXT NOT NULL, signature BLOB NOT NULL)")
+        self.conn.execute("CREATE TABLE buckets (key INTEGER NOT NULL, id INTEGER NOT NULL)")
+        self.conn.execute("CREATE INDEX idx_buckets_key ON buckets(key)")
+
+    def band_keys(self, company: str | None, signature: np.ndarray) -> list[int]:
+        """One 64-bit key per band, hashed from the company and the band's rows"""
+        prefix = (company or "").encode("utf-8") + b"\x00"
+        keys = []
+        for band in range(BANDS):
+            rows = signature[band*self.rows:(band+1)*self.rows].tobytes()
+            digest = hashlib.blake2b(prefix + bytes([band]) + rows, digest_size=8).digest()
+            keys.append(int.from_bytes(digest, "little", signed=True))
+        return keys
+
+    def canonical(self, jobkey: str, company: str | None, signature: np.ndarray) -> str | None:
+        """Return the canonical jobkey this job duplicates, or register it as a new canonical job"""
+        keys = self.band_keys(company, signature)
+        marks = ",".join("?" * len(keys))
+        candidates = self.conn.execute(
+            f"""
+            SELECT DISTINCT signatures.id, signatures.jobkey, signatures.signature
+            FROM buckets JOIN signatures ON signatures.id = buckets.id
+            WHERE buckets.key IN ({marks})
+            ORDER BY signatures.id
+            """,
+            keys,
+        ).fetchall()
+        for _, candidate, blob in candidates:
+            if similarity(signature, np.frombuffer(blob, dtype=np.uint32)) >= self.threshold:
+                return candidate
+
+        job_id = self.conn.execute("INSERT INTO signatures (jobkey, signature) VALUES (?, ?)", (jobkey, signature.tobytes())).lastrowid
+        self.conn.executemany("INSERT INTO buckets (key, id) VALUES (?, ?)", [(key, job_id) for key in keys])
+        return None
+
+    def close(self):
+        self.conn.close()
+
+
+class Deduplicator:
+    """Drops the chunks of near-duplicate jobs during ingest and folds them into their canonical job"""
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.index = DuplicateIndex(threshold)
+        #* Only (canonical, duplicate) jobkey pairs are kept, the rest of each copy is read back from its stored card
+        self.index.conn.execute("CREATE TABLE duplicates (canonical TEXT NOT NULL, jobkey TEXT NOT NULL)")
+        self.skipped = 0
+
+    def filter(self, prepared):
+        """Pass prepared jobs through, keeping a duplicate's document but not its chunks"""
+        for doc in prepared:
+            if doc.signature is None or not doc.chunks:
+                yield doc
+                continue
+
+            payload = doc.chunks[0].payload
+            jobkey = payload.get("jobkey")
+            canonical = self.index.canonical(jobkey, payload.get("companyName"), doc.signature)
+            if canonical is None:
+                yield doc
+            else:
+                self.index.conn.execute("INSERT INTO duplicates (canonical, jobkey) VALUES (?, ?)", (canonical, jobkey))
+                self.skipped += 1
+                yield doc._replace(chunks=[])
+
+    def merged_payload(self, cards: list[dict]) -> dict:
+        """Locations, jobkeys and filter values of every copy, so filters match any of its locations"""
+        return {
+            "duplicateJobkeys": [card.get("jobkey") for card in cards[1:]],
+            "locations": [card.get("locationInfo") for card in cards],
+            "filters": union_filters(cards),
+        }
+
+    def apply(self, client: QdrantClient, collection: str):
+        """Write the merged payload onto the points and the stored card of every canonical job that absorbed duplicates"""
+        store = get_doc_store()
+        merged = 0
+        rows = self.index.conn.execute("SELECT canonical, jobkey FROM duplicates ORDER BY canonical, rowid").fetchall()
+        for canonical, group in groupby(rows, key=lambda row: row[0]):
+            jobkeys = [canonical] + [jobkey for _, jobkey in group]
+            cards = store.get_cards(jobkeys)
+            if canonical not in cards:
+                continue
+            payload = self.merged_payload([cards[jobkey] for jobkey in jobkeys if jobkey in cards])
+            client.set_payload(
+                collection_name = collection,
+                payload = payload,
+                points = models.Filter(must=[models.FieldCondition(key="jobkey", match=models.MatchValue(value=canonical))]),
+            )
+            #? Shared chunks and their search hits read the card, it must carry the merge too
+            store.put_cards({canonical: {**cards[canonical], **payload}})
+            merged += 1
+        logger.info(f"Collapsed {self.skipped} near-duplicate jobs into {merged} canonical jobs")
+        self.index.close()
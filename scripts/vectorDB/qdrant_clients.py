@@ -0,0 +1,112 @@
+import os
+import atexit
+import asyncio
+import threading
+import weakref
+
+import httpx
+
+from loguru import logger
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+
+#* Connection settings, CVEC_QDRANT_PATH switches to embedded local mode (a directory or ":memory:")
+QDRANT_URL = os.environ.get("CVEC_QDRANT_URL", "http://localhost:6333")
+QDRANT_PATH = os.environ.get("CVEC_QDRANT_PATH")
+QDRANT_API_KEY = os.environ.get("QDRANT_API_KEY")
+QDRANT_TIMEOUT = int(os.environ.get("CVEC_QDRANT_TIMEOUT", 30))
+QDRANT_RETRIES = int(os.environ.get("CVEC_QDRANT_RETRIES", 3))
+QDRANT_POOL_SIZE = int(os.environ.get("CVEC_QDRANT_POOL_SIZE", 16))
+QDRANT_PREFER_GRPC = os.environ.get("CVEC_QDRANT_PREFER_GRPC", "0").lower() in ("1", "true", "yes")
+
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+_loop = None
+
+
+def is_local() -> bool:
+    """True when running against embedded local mode, which only supports one writer thread"""
+    return bool(QDRANT_PATH)
+
+
+def client_kwargs(prefer_grpc: bool, asynchronous: bool = False) -> dict:
+    if is_local():
+        return {"location": ":memory:"} if QDRANT_PATH == ":memory:" else {"path": QDRANT_PATH}
+
+    limits = httpx.Limits(max_connections=QDRANT_POOL_SIZE, max_keepalive_connections=QDRANT_POOL_SIZE)
+    #? The transport retries failed connects, requests that reached the server are not replayed
+    transport = (httpx.AsyncHTTPTransport if asynchronous else httpx.HTTPTransport)(retries=QDRANT_RETRIES, limits=limits)
+    return {
+        "url": QDRANT_URL,
+        "api_key": QDRANT_API_KEY,
+        "timeout": QDRANT_TIMEOUT,
+        #? The version check is a blocking request per client, run it once by hand if needed
+        "check_compatibility": False,
+        "prefer_grpc": prefer_grpc,
+        "grpc_options": {"grpc.enable_retries": 1 if QDRANT_RETRIES else 0},
+        "pool_size": QDRANT_POOL_SIZE,
+        "transport": transport,
+    }
+
+
+def get_client(prefer_grpc: bool | None = None) -> QdrantClient:
+    """Return the process-wide Qdrant client, connecting on first use.
+
+    One client is shared by every thread and Streamlit session, its HTTP connection pool
+    (or gRPC channel pool) is what lets concurrent searches reuse connections.
+    """
+    prefer_grpc = QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc
+    #? Local mode keeps its data in the client, so there is only ever one of them
+    key = "local" if is_local() else prefer_grpc
+    with _lock:
+        if key not in _clients:
+            logger.info(f"Connecting to Qdrant at {QDRANT_PATH or QDRANT_URL}")
+            _clients[key] = QdrantClient(**client_kwargs(prefer_grpc))
+        return _clients[key]
+
+
+def get_async_client(prefer_grpc: bool | None = None) -> AsyncQdrantClient:
+    """Return the async Qdrant client of the running event loop, its connections are bound to that loop"""
+    if is_local():
+        raise ValueError("The async client needs a Qdrant server, local mode data lives in the sync client")
+
+    prefer_grpc = QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    if prefer_grpc not in clients:
+        clients[prefer_grpc] = AsyncQdrantClient(**client_kwargs(prefer_grpc, asynchronous=True))
+    return clients[prefer_grpc]
+
+
+def run_async(coro):
+    """Run a coroutine on the process-wide background event loop and wait for its result.
+    
+    Sync callers (Streamlit sessions) go through here instead of asyncio.run, so the async
+    clients of that one loop, and their connection pools, are reused by every call.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="qdrant-async", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
+
+async def close_async_clients():
+    """Close the async clients of the running event loop, for loops that end with the run"""
+    for client in _async_clients.pop(asyncio.get_running_loop(), {}).values():
+        await client.close()
+
+
+def close_clients():
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        loop = _loop
+    if loop is not None and loop.is_running():
+        asyncio.run_coroutine_threadsafe(close_async_clients(), loop).result()
+
+
+atexit.register(close_clients)
@@ -0,0 +1,97 @@
+import io
+import re
+
+from pathlib import Path
+
+
+#* Resume headings -> the section they start, matched against whole short lines
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "profile", "objective", "about me"],
+    "experience": [
+        "experience", "work experience", "professional experience", "relevant experience",
+        "research experience", "employment", "employment history", "work history",
+    ],
+    "projects": ["projects", "personal projects", "academic projects", "selected projects"],
+    "skills": ["skills", "technical skills", "core competencies", "technologies", "tools", "skills & tools"],
+    "education": ["education", "academic background"],
+    "certifications": ["certifications", "certificates", "licenses & certifications"],
+}
+HEADING_SECTIONS = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+#* Sections embedded as separate search queries, the rest say little about which jobs fit
+QUERY_SECTIONS = ("summary", "experience", "projects", "skills")
+MIN_SECTION_CHARS = 40
+
+
+def file_bytes(file_input) -> tuple[bytes, str]:
+    """Return the raw bytes and lowercase extension of a local path or a Streamlit upload"""
+    if isinstance(file_input, (str, Path)):
+        return Path(file_input).read_bytes(), Path(file_input).suffix.lower()
+    return file_input.getvalue(), Path(file_input.name).suffix.lower()
+
+
+def file_type(data: bytes, ext: str) -> str | None:
+    """Trust the file's magic bytes over its name, uploads are often misnamed"""
+    if data.startswith(b"%PDF"):
+        return "pdf"
+    if data.startswith(b"PK") and ext != ".pdf":
+        return "docx"
+    return {".pdf": "pdf", ".docx": "docx", ".txt": "txt"}.get(ext)
+
+
+def pdf_text(data: bytes) -> str:
+    import pymupdf
+
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        pages = [page.get_text("text", sort=True) for page in doc]
+    return "\n".join(pages)
+
+
+def docx_text(data: bytes) -> str:
+    import docx2txt
+
+    return docx2txt.process(io.BytesIO(data))
+
+
+def clean_text(text: str) -> str:
+    """Drop the blank lines and trailing spaces PDF extraction leaves between blocks"""
+    lines = (line.rstrip() for line in text.replace("\x00", "").splitlines())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def parse_resume(file_input) -> str:
+    """Return the full text of a PDF or DOCX resume, read straight from memory with no temp file"""
+    data, ext = file_bytes(file_input)
+    kind = file_type(data, ext)
+    if kind == "pdf":
+        text = pdf_text(data)
+    elif kind == "docx":
+        text = docx_text(data)
+    elif kind == "txt":
+        text = data.decode("utf-8", errors="replace")
+    else:
+        raise ValueError(f"Unsupported resume file type: {ext or 'unknown'}")
+    return clean_text(text)
+
+
+def split_sections(text: str) -> dict[str, str]:
+    """Split resume text on its headings, lines before the first heading are kept as `header`"""
+    sections = {}
+    current = "header"
+    for line in text.splitlines():
+        heading = re.sub(r"[^a-z& ]", "", line.lower()).strip()
+        if len(heading) <= 40 and heading in HEADING_SECTIONS:
+            current = HEADING_SECTIONS[heading]
+            continue
+        sections.setdefault(current, []).append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items()}
+
+
+def resume_queries(text: str) -> list[str]:
+    """The texts to embed as search queries for a resume, one per matching section or the whole resume"""
+    sections = split_sections(text)
+    queries = [
+        sections[name]
+        for name in QUERY_SECTIONS
+        if len(sections.get(name, "")) >= MIN_SECTION_CHARS
+    ]
+    return queries or [text]
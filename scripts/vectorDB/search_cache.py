@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from array import array
+from pathlib import Path
+from qdrant_client import models
+
+from .filters import normalized_filter_dict
+from .doc_store import compress, decompress
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+SEARCH_CACHE_PATH = os.environ.get("CVEC_SEARCH_CACHE", os.path.join(BASE_DIR, "data/cache/search.sqlite"))
+SEARCH_CACHE_TTL = float(os.environ.get("CVEC_SEARCH_CACHE_TTL", 3600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("CVEC_SEARCH_CACHE_MAX_ENTRIES", 5000))
+
+
+def resume_fingerprint(embeddings: list[list[float]], query_text: str | None = None) -> str:
+    """Short hash of a resume's query vectors (as float32) and its keyword query text"""
+    digest = hashlib.blake2b(digest_size=16)
+    for vector in embeddings:
+        digest.update(array("f", vector).tobytes())
+    digest.update((query_text or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def search_key(fingerprint: str, filter_dict: dict, collection: str, **params) -> str:
+    raw = json.dumps(
+        {"fingerprint": fingerprint, "filters": normalized_filter_dict(filter_dict), "collection": collection, **params},
+        sort_keys = True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """SQLite cache of ranked search results shared by every app process and kept across restarts.
+
+    Entries expire after `ttl` seconds, the least recently used ones are dropped past
+    `max_entries`, and re-ingesting a collection invalidates all of its entries.
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl: float = SEARCH_CACHE_TTL, max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        #? Streamlit serves sessions from threads, they share this connection one statement at a time
+        self.lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                collection TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                body BLOB NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_collection ON results(collection)")
+        self.conn.commit()
+
+    def get(self, key: str) -> list[models.ScoredPoint] | None:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT codec, body FROM results WHERE key = ? AND created > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+
+        hits = json.loads(decompress(*row))
+        return [models.ScoredPoint(id=hit["id"], version=0, score=hit["score"], payload=hit["payload"]) for hit in hits]
+
+    def put(self, key: str, collection: str, results: list[models.ScoredPoint]):
+        hits = [{"id": point.id, "score": point.score, "payload": point.payload} for point in results]
+        codec, body = compress(json.dumps(hits, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, collection, codec, body, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, collection, codec, body, now, now),
+            )
+            self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        with self.lock:
+            self.conn.execute("DELETE FROM results WHERE created <= ?", (time.time() - self.ttl,))
+            self.conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.conn.commit()
+
+    def invalidate(self, collection: str):
+        """Forget every cached search of a collection, called once it has been re-ingested"""
+        with self.lock:
+            self.conn.execute("DELETE FROM results WHERE collection = ?", (collection,))
+            self.conn.commit()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self.conn.close()
+
+
+_cache = None
+
+
+def get_search_cache() -> SearchCache:
+    """Return the process-wide search cache, opening it on first use"""
+    global _cache
+    if _cache is None:
+        _cache = SearchCache()
+    return _cache
@@ -0,0 +1,57 @@
+import re
+import hashlib
+
+from collections import Counter
+from qdrant_client import models
+
+
+SPARSE_VECTOR = "keywords"
+#? BM25 term-frequency saturation and length normalization, IDF is applied by Qdrant (Modifier.IDF)
+BM25_K1 = 1.2
+BM25_B = 0.75
+#* Roughly the words in a full 230-token chunk
+AVG_DOC_WORDS = 170
+
+#? Keep skill names like c++, c#, node.js and scikit-learn as single terms
+WORD = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[.\-/][a-z0-9+#]+)*")
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does
+doing during each for from further had has have having he her here hers him his how i if in into is
+it its itself just me more most my no nor not now of off on once only or other our ours out over own
+same she should so some such than that the their theirs them then there these they this those through
+to too under until up very was we were what when where which while who whom why will with would you
+your yours
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    words = [w for w in WORD.findall(text.lower()) if w not in STOPWORDS]
+    #? Bigrams let phrases like "causal inference" or "machine learning" match as a unit
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def term_index(term: str) -> int:
+    """Stable 31-bit index for a term, the same in every process and on every run"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little") & 0x7FFFFFFF
+
+
+def term_weights(text: str, saturate: bool) -> dict[int, float]:
+    terms = tokenize(text)
+    counts = Counter(term_index(term) for term in terms)
+    if not saturate:
+        return {index: float(tf) for index, tf in counts.items()}
+
+    #? n words give n - 1 bigrams
+    length = (len(terms) + 1) / 2
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / AVG_DOC_WORDS)
+    return {index: tf * (BM25_K1 + 1) / (tf + norm) for index, tf in counts.items()}
+
+
+def sparse_vector(text: str, query: bool = False) -> models.SparseVector:
+    """BM25-style keyword vector of a chunk, or of a query when `query=True` (raw term counts)"""
+    weights = term_weights(text, saturate=not query)
+    return models.SparseVector(indices=list(weights), values=list(weights.values()))
+
+
+def sparse_vectors_config() -> dict[str, models.SparseVectorParams]:
+    return {SPARSE_VECTOR: models.SparseVectorParams(modifier=models.Modifier.IDF)}
@@ -1,83 +1,214 @@
-﻿from typing import List
+﻿import os
+import heapq
+import asyncio
+
+from typing import List
 from pathlib import Path
 from loguru import logger
 from .vector_store import *
+from .filters import FILTER_KEYS, normalized_filter_dict
+from .search_cache import get_search_cache, resume_fingerprint, search_key
+from .qdrant_clients import get_async_client, get_client, is_local, run_async
+from .resume_parser import parse_resume, resume_queries
+from .sparse_vectors import sparse_vector
+from .chunker import truncate_text
+from .doc_store import SEARCH_FIELDS
+from .local_index import get_local_index
+from .chunk_store import SKIP_BOILERPLATE, boilerplate_condition, job_hits
 from qdrant_client import models
 
 
-qdrant_client = init_vectorDB()
+#* "qdrant", or "local" for the in-process exact search over an exported local index
+SEARCH_ENGINE = os.environ.get("CVEC_SEARCH_ENGINE", "qdrant")
+#* Collections a federated search covers, one per crawled role family
+SEARCH_COLLECTIONS = os.environ.get("CVEC_SEARCH_COLLECTIONS", "ds_jobs").split(",")
 
 
-def process_resume(file, model_name: str="text-embedding-3-large"):
-    resume = load_data(file)
-    resume_content = resume[0].page_content
-    resume_embeddings = get_embeddings(resume_content, model_name)
+def process_resume(file, model_name: str = DEFAULT_MODEL):
+    #? Every page of the resume, parsed from the upload's bytes instead of a temp file
+    resume_content = parse_resume(file)
+    #? One embedding per section, vector_search fuses their hits in a single request
+    max_input = get_backend(model_name).max_input_tokens
+    queries = [truncate_text(query, max_input, model_name)[0] for query in resume_queries(resume_content)]
+    resume_embeddings = get_embeddings(queries, model_name)
     return resume_content, resume_embeddings
 
 
 def search_filter(filter_dict: dict):
-    key_map = {
-        "filter_job_type": "jobType",
-        "filter_state": "locationInfo.jobLocationState",
-        "filter_city": "locationInfo.jobLocationCity",
-    }
-    
-    query_filter = models.Filter(must = [])
-    for key, value in filter_dict.items():
-        if key == "filter_city" and value == "Bay Area":
-            value = "San Francisco Bay Area"
-        if value is not None:
-            search_key = key_map.get(key)
-            if search_key:
-                query_filter.must.append(
-                    models.FieldCondition(
-                        key = search_key,
-                        match = models.MatchValue(value=value)
-                    )
-                )
+    query_filter = models.Filter(must = [], must_not = boilerplate_condition())
+    #? Match on the normalized copy, so casing and aliases like "Bay Area" resolve the same way as at ingest
+    for key, value in normalized_filter_dict(filter_dict).items():
+        query_filter.must.append(
+            models.FieldCondition(
+                key = FILTER_KEYS[key],
+                match = models.MatchValue(value=value)
+            )
+        )
     
     return query_filter
 
-def vector_search(embeddings: list[list[float]], filter_dict: dict, collection: str = "ds_jobs", k: int = 300):
-    try:
-        result = qdrant_client.query_points_groups(
-            collection_name = collection,
-            query = embeddings[0],
-            group_by = "jobkey",
-            limit = k,
-            query_filter = search_filter(filter_dict),
-            with_payload = True,
-        )
+
+def group_query(collection: str, embeddings: list[list[float]], filter_dict: dict, k: int, profile: str, sparse) -> dict:
+    """query_points_groups arguments of a search, the same for the sync and the async client"""
+    return dict(
+        collection_name = collection,
+        group_by = "jobkey",
+        group_size = 1,
+        limit = k,
+        query_filter = search_filter(filter_dict),
+        with_payload = models.PayloadSelectorInclude(include=SEARCH_FIELDS),
+        **get_profile(profile).fused_query_kwargs(embeddings, k, sparse),
+    )
+
+
+def vector_search(
+    embeddings: list[list[float]],
+    filter_dict: dict,
+    collection: str = "ds_jobs",
+    k: int = 300,
+    profile: str = DEFAULT_PROFILE,
+    query_text: str | None = None,
+    use_cache: bool = True,
+):
+    #? Filter toggles and page switches repeat the same search, serve those from the shared cache
+    cache = get_search_cache() if use_cache else None
+    key = search_key(resume_fingerprint(embeddings, query_text), filter_dict, collection, k=k, profile=profile, engine=SEARCH_ENGINE, skip_boilerplate=SKIP_BOILERPLATE)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
     
-        job_scores = {}
-        for group in result.groups:
-            group_id = group.id
-            if group_id not in job_scores:
-                job_scores[group_id] = {}
-            for point in group.hits:
-                point_id = point.id
-                score = point.score
-                job_scores[group_id][point_id] = score
-        
-        ranked_pairs = []
-        for jobKey in job_scores:
-            scores = job_scores[jobKey]
-            max_jobID = max(scores, key=scores.get)
-            ranked_pairs.append((jobKey, max_jobID, scores[max_jobID]))
+    #? With the resume text, keyword matches on exact skills are fused in next to the dense hits
+    sparse = sparse_vector(query_text, query=True) if query_text else None
+    try:
+        if SEARCH_ENGINE == "local":
+            #? Exact dense search, section vectors are combined by their best score instead of RRF
+            top_jobs = get_local_index(collection).search(embeddings, search_filter(filter_dict), k)
         
-        ranked_pairs.sort(key=lambda x: x[2], reverse=True)
-        ranked_jobIDs = [job_id for _, job_id, _ in ranked_pairs]
+        else:
+            result = get_client().query_points_groups(**group_query(collection, embeddings, filter_dict, k, profile, sparse))
+            
+            #? Groups come back ordered by their best hit, and that hit's chunk is the job's snippet
+            top_jobs = job_hits([(group.id, group.hits[0]) for group in result.groups], filter_dict)
         
-        top_jobs = qdrant_client.retrieve(
-            collection_name = collection,
-            ids = ranked_jobIDs,
-        )
+        if cache is not None:
+            cache.put(key, collection, top_jobs)
         return top_jobs
 
     except Exception as e:
         logger.error(f"Error: {e}")
 
 
+async def avector_search(
+    embeddings: list[list[float]],
+    filter_dict: dict,
+    collection: str = "ds_jobs",
+    k: int = 300,
+    profile: str = DEFAULT_PROFILE,
+    query_text: str | None = None,
+    use_cache: bool = True,
+) -> list[models.ScoredPoint]:
+    """Async vector_search, a failed search raises instead of being logged"""
+    cache = get_search_cache() if use_cache else None
+    key = search_key(resume_fingerprint(embeddings, query_text), filter_dict, collection, k=k, profile=profile, engine=SEARCH_ENGINE, skip_boilerplate=SKIP_BOILERPLATE)
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached
+    
+    sparse = sparse_vector(query_text, query=True) if query_text else None
+    if SEARCH_ENGINE == "local":
+        top_jobs = await asyncio.to_thread(get_local_index(collection).search, embeddings, search_filter(filter_dict), k)
+    
+    else:
+        query = group_query(collection, embeddings, filter_dict, k, profile, sparse)
+        if is_local():
+            #? The embedded client has no async twin, run it off the event loop instead
+            result = await asyncio.to_thread(lambda: get_client().query_points_groups(**query))
+        else:
+            result = await get_async_client().query_points_groups(**query)
+        top_jobs = await asyncio.to_thread(job_hits, [(group.id, group.hits[0]) for group in result.groups], filter_dict)
+    
+    if cache is not None:
+        await asyncio.to_thread(cache.put, key, collection, top_jobs)
+    return top_jobs
+
+
+def merge_results(results: list[list[models.ScoredPoint]], k: int) -> list[models.ScoredPoint]:
+    """Merge rankings that are each sorted by score into one top k, keeping each job's best hit.
+    
+    heapq.merge only holds the current head of every ranking, and stops reading as soon
+    as k distinct jobs are out, so a merge never sorts the full union of results.
+    """
+    top_jobs = []
+    seen = set()
+    for hit in heapq.merge(*results, key=lambda hit: -hit.score):
+        jobkey = hit.payload.get("jobkey")
+        if jobkey in seen:
+            continue
+        seen.add(jobkey)
+        top_jobs.append(hit)
+        if len(top_jobs) == k:
+            break
+    return top_jobs
+
+
+async def afederated_search(
+    embeddings: list[list[float]],
+    filter_dict: dict,
+    collections: list[str] = SEARCH_COLLECTIONS,
+    k: int = 300,
+    profile: str = DEFAULT_PROFILE,
+    query_text: str | None = None,
+    use_cache: bool = True,
+) -> list[models.ScoredPoint]:
+    """Search every collection at once and merge their results into one top k, deduplicated by jobkey.
+    
+    The searches run concurrently, so the latency is the slowest collection's, not their sum.
+    A collection that fails is logged and left out. Every collection must be indexed with the
+    same model and profile, or their scores cannot be compared.
+    """
+    results = await asyncio.gather(
+        *(avector_search(embeddings, filter_dict, collection, k, profile, query_text, use_cache) for collection in collections),
+        return_exceptions = True,
+    )
+    ranked = []
+    for collection, result in zip(collections, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Search of {collection} failed: {result}")
+        else:
+            ranked.append(result)
+    return merge_results(ranked, k)
+
+
+def federated_search(
+    embeddings: list[list[float]],
+    filter_dict: dict,
+    collections: list[str] = SEARCH_COLLECTIONS,
+    k: int = 300,
+    profile: str = DEFAULT_PROFILE,
+    query_text: str | None = None,
+    use_cache: bool = True,
+):
+    #? A single collection needs no event loop
+    if len(collections) == 1:
+        return vector_search(embeddings, filter_dict, collections[0], k, profile, query_text, use_cache)
+    #? The shared background loop keeps one async client and its connections across searches
+    return run_async(afederated_search(embeddings, filter_dict, collections, k, profile, query_text, use_cache))
+
+
+def get_job_details(jobkey: str) -> dict:
+    """Return the detail fields (full description, company images and reviews) of a job from the document store"""
+    details = get_doc_store().get(jobkey) or {}
+    #? The stored card copy is only for resolving shared chunk hits, it is not a detail field
+    details.pop("card", None)
+    return details
+
+
+def get_job_description(jobkey: str) -> str | None:
+    return get_job_details(jobkey).get("jobDescription")
+
+
 def format_job_results(top_jobs: list[PointStruct]):
     for i, job in enumerate(top_jobs[:10]):
         print(f"Matched Job #{i+1}")
@@ -85,7 +216,7 @@ def format_job_results(top_jobs: list[PointStruct]):
         print(f"Company: {job.payload.get('companyName', 'N/A')}")
         print(f"Job Type: {job.payload.get('jobType', 'N/A')}")
         print(f"Job Link: {job.payload.get('jobLink', 'N/A')}")
-        print(f"Job Description: \n {job.payload.get('jobDescription', 'N/A')[:1000]} \n ...")
+        print(f"Job Description: \n {(get_job_description(job.payload.get('jobkey')) or 'N/A')[:1000]} \n ...")
         print("-" * 50)
 
 
@@ -93,7 +224,7 @@ if __name__ == "__main__":
     BASE_DIR = Path(__file__).resolve().parents[2]
     
     resume_path = "/Users/yiwen/Desktop/resume_yiwen.pdf"
-    model_name = "text-embedding-3-large"
+    model_name = DEFAULT_MODEL
     collection = "ds_jobs"
     
     resume_embeddings = process_resume(resume_path)
@@ -1,24 +1,47 @@
 ﻿import os
+import json
+import queue
 import getpass
-import tiktoken
 import tempfile
+import threading
 import multiprocessing as mp
+import numpy as np
 
 from pathlib import Path
-from openai import OpenAI
-from functools import partial
-from multiprocessing import Pool
-from bs4 import BeautifulSoup, Tag
-from chonkie.cloud import SentenceChunker
+from typing import NamedTuple
+from loguru import logger
+from itertools import batched, chain
 from uuid import uuid4,uuid5, NAMESPACE_DNS
-from langchain_community.llms import ollama
+from langchain_core.documents import Document
+from langchain_core.document_loaders import BaseLoader
 from langchain_community.document_loaders import *
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+from qdrant_client.models import PointStruct
+
+from . import chunker
+from .chunker import get_encoding
+from .embedding_cache import get_cache
+from .bulk_upload import BulkUploader
+from .html_clean import clean_description
+from .json_stream import iter_jobs, iter_records
+from .sparse_vectors import sparse_vector
+from .search_cache import get_search_cache
+from .qdrant_clients import QDRANT_PREFER_GRPC, get_client, is_local
+from .chunk_store import ChunkStore
+from .near_duplicates import Deduplicator, minhash
+from .worker_pool import check_pool, get_pool
+from .filters import ensure_payload_indexes, normalized_filters
+from .doc_store import PREVIEW_CHARS, JobDocument, get_doc_store, split_job
+from .embedding_batcher import PendingChunk, pack_batches
+from .ingest_pipeline import DONE, PipelineError, AsyncStage, Stage, bounded_imap_unordered, put
+from .embedding_backends import DEFAULT_MODEL, close_async_clients, get_backend
+from .collection_profiles import DEFAULT_PROFILE, get_profile
 
 
 MAX_TOKENS = 230
+CHUNK_OVERLAP = 128
 BATCH_SIZE = 100
+#? Jobs per worker task, enough to amortize pickling and batch the tokenizer
+JOBS_PER_TASK = 64
 
 
 def load_api(api: str):
@@ -40,11 +63,50 @@ def input_files(directory: str) -> list[str]:
     """Return a list of the documents' file paths"""
     file_paths = []
     for file in os.listdir(directory):
-        if file.endswith(".pdf") or file.endswith(".json"):
+        if file.endswith(".pdf") or file.endswith(".json") or file.endswith(".jsonl"):
             file_paths.append(os.path.join(directory, file))
     return file_paths
 
 
+class JobFileLoader(BaseLoader):
+    """Streams jobs out of a JSON array or JSON Lines file instead of parsing the whole file up front"""
+    
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+    
+    def lazy_load(self):
+        for job in iter_jobs(self.file_path):
+            yield Document(
+                page_content = job.get("description") or "",
+                metadata = metadata_func(job, {}),
+            )
+
+
+def get_loader(path: str):
+    """Return the LangChain loader for a file and the file type it tags documents with"""
+    if path.endswith(".pdf"):
+        loader = PyMuPDFLoader(
+            file_path = path,
+            extract_tables = False,
+            mode = "page",
+        )
+        return loader, "pdf"
+    
+    elif path.endswith((".json", ".jsonl")):
+        loader = JobFileLoader(
+            file_path = path,
+        )
+        return loader, "json"
+    
+    elif path.endswith(".docx"):
+        loader = Docx2txtLoader(
+            file_path = path,
+        )
+        return loader, "docx"
+    
+    return None, None
+
+
 def load_data(file_input):
     """Return a list of the documents' text content"""
     docs = []
@@ -66,37 +128,13 @@ def load_data(file_input):
         paths = [temp_path]
     
     for path in paths:
-        if path.endswith(".pdf"):
-            loader = PyMuPDFLoader(
-                file_path = path,
-                extract_tables = False,
-                mode = "page",
-            )
-            loaded_docs = loader.load()
-            for doc in loaded_docs:
-                doc.metadata["file_type"] = "pdf"
-            docs.extend(loaded_docs)
-        
-        elif path.endswith(".json"):
-            loader = JSONLoader(
-                file_path = path,
-                jq_schema = ".[]",
-                content_key = "description",
-                metadata_func = metadata_func,
-            )
-            loaded_docs = loader.load()
-            for doc in loaded_docs:
-                doc.metadata["file_type"] = "json"
-            docs.extend(loaded_docs)
-        
-        elif path.endswith(".docx"):
-            loader = Docx2txtLoader(
-                file_path = path,
-            )
-            loaded_docs = loader.load()
-            for doc in loaded_docs:
-                doc.metadata["file_type"] = "docx"
-            docs.extend(loaded_docs)
+        loader, file_type = get_loader(path)
+        if loader is None:
+            continue
+        loaded_docs = loader.load()
+        for doc in loaded_docs:
+            doc.metadata["file_type"] = file_type
+        docs.extend(loaded_docs)
     
     #? Check if the temp file is still exists, clean up if it does
     if temp_status and temp_path and os.path.exists(temp_path):
@@ -105,121 +143,341 @@ def load_data(file_input):
     return docs
 
 
-def chunk_text(text: str):
-    chunker = SentenceChunker(
-        tokenizer_or_token_counter = tiktoken.get_encoding("cl100k_base"),
-        chunk_size = MAX_TOKENS,
-        chunk_overlap = 128,
-        min_sentences_per_chunk = 1,
-        return_type = "texts",
-    )
-    chunks = chunker.chunk(text)
-    
-    return chunks
+def iter_raw_jobs(paths: list[str]):
+    """Yield each job record of the given JSON array / JSON Lines files as raw JSON bytes"""
+    for path in paths:
+        if path.endswith((".json", ".jsonl")):
+            yield from iter_records(path)
+        
+        elif not path.endswith(".pdf"):
+            logger.warning(f"Skipping {path}, only job JSON and PDF files are ingested")
+
+
+def chunk_text(text: str, model_name: str = "text-embedding-3-large") -> list[str]:
+    return [chunk.text for chunk in chunker.chunk_text(text, MAX_TOKENS, CHUNK_OVERLAP, model_name)]
 
 
 def num_tokens(text: str, model_name: str = "text-embedding-3-large") -> int:
     """Returns the number of tokens in a text string."""
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
-    num_tokens = len(encoding.encode(text))
-    return num_tokens
-
-
-def get_embeddings(chunks: list[str], model_name: str):
-    if model_name == "text-embedding-3-large":
-        load_api("OPENAI_API_KEY")
-        client = OpenAI()
-        response = client.embeddings.create(
-            input = chunks,
-            model = "text-embedding-3-large",
-        )
-        embeddings = [i.embedding for i in response.data]
+    return len(get_encoding(model_name).encode(text, disallowed_special=()))
+
+
+def embed_texts(chunks: list[str], model_name: str):
+    return get_backend(model_name).embed(chunks)
+
+
+def lookup_cache(chunks: list[str], model_name: str):
+    """Return the cached embeddings (None for misses) and the distinct texts that still need embedding"""
+    dims = get_backend(model_name).dimensions
+    embeddings = get_cache().get_many(model_name, dims, chunks)
     
-    elif model_name == "nomic-embed-text":
-        response = ollama.embed(
-            input = chunks,
-            model = "nomic-embed-text",
-        )
-        embeddings = response.embeddings
+    #? Embed each distinct missing text once, even if it repeats within the request
+    missing = list(dict.fromkeys(chunk for chunk, vec in zip(chunks, embeddings) if vec is None))
+    hits = sum(vec is not None for vec in embeddings)
+    logger.info(f"Embedding cache: {hits} hits, {len(chunks) - hits} misses")
+    return embeddings, missing
+
+
+def fill_cache(chunks: list[str], embeddings: list, missing: list[str], new_vectors: list, model_name: str):
+    """Store freshly embedded texts in the cache and slot them into the embeddings list"""
+    dims = get_backend(model_name).dimensions
+    get_cache().put_many(model_name, dims, missing, new_vectors)
+    fresh = dict(zip(missing, new_vectors))
+    return [vec if vec is not None else fresh[chunk] for chunk, vec in zip(chunks, embeddings)]
+
+
+def get_embeddings(chunks: str | list[str], model_name: str, use_cache: bool = True):
+    """Return one embedding per chunk, only calling the model for chunks missing from the cache"""
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    
+    if not use_cache:
+        return embed_texts(chunks, model_name)
+    
+    embeddings, missing = lookup_cache(chunks, model_name)
+    if missing:
+        new_vectors = embed_texts(missing, model_name)
+        embeddings = fill_cache(chunks, embeddings, missing, new_vectors, model_name)
     
     return embeddings
 
 
-def init_vectorDB(collection: str = None):
-    client = QdrantClient(url="http://localhost:6333")
-    if collection is not None and collection not in client.get_collections():
+async def aget_embeddings(chunks: list[str], model_name: str, tokens: dict | None = None):
+    """Async get_embeddings, sending cache misses through the backend's async client"""
+    embeddings, missing = lookup_cache(chunks, model_name)
+    if not missing:
+        return embeddings
+    
+    token_count = sum(tokens[text] for text in missing) if tokens else None
+    new_vectors = await get_backend(model_name).aembed(missing, token_count)
+    return fill_cache(chunks, embeddings, missing, new_vectors, model_name)
+
+
+def init_vectorDB(collection: str = None, model_name: str = DEFAULT_MODEL, profile: str = DEFAULT_PROFILE, prefer_grpc: bool | None = None):
+    client = get_client(prefer_grpc)
+    if collection is not None and not client.collection_exists(collection):
+        collection_profile = get_profile(profile)
+        backend = get_backend(model_name)
+        if collection_profile.matryoshka_dim and not backend.matryoshka:
+            raise ValueError(f"{model_name} embeddings cannot be truncated for the {profile} profile")
         client.create_collection(
-            collection_name=collection,
-            vectors_config=VectorParams(size=3072, distance=Distance.COSINE),
+            collection_name = collection,
+            vectors_config = collection_profile.vectors_config(backend.dimensions),
+            sparse_vectors_config = collection_profile.sparse_vectors_config(),
+            hnsw_config = collection_profile.hnsw_config(),
+            quantization_config = collection_profile.quantization_config(),
         )
+    
+    if collection is not None:
+        ensure_payload_indexes(client, collection)
     return client
 
 
-def process_doc(doc, model_name: str) -> list[PointStruct]:
-    points = []
-    file_type = doc.metadata.get("file_type")
+class PreparedDoc(NamedTuple):
+    chunks: list[PendingChunk]
+    document: JobDocument | None
+    signature: np.ndarray | None = None
+
+
+def prepare_job(job: dict, html: str, text: str, chunks: list[chunker.Chunk]) -> PreparedDoc:
+    """Build the point payload, detail document and pending chunks of a cleaned job"""
+    job_key = job.get("jobkey")
+    job_id = str(uuid5(NAMESPACE_DNS, job_key))
+    job = metadata_func(job, {})
+    job["jobDescription"] = html
     
-    if file_type == "json":
-        job_key = doc.metadata.get("jobkey")
-        job_id = str(uuid5(NAMESPACE_DNS, job_key))
-        
-        text = doc.page_content
-        payload = metadata_func(doc.metadata, {})
-        soup = BeautifulSoup(text, "html.parser")
-        
-        for br in soup.find_all("br"):
-            while isinstance(br.next_sibling, Tag) and br.next_sibling.name == "br":
-                br.next_sibling.extract()
-        
-        payload["jobDescription"] = soup.prettify()
-        desc_text = soup.get_text(separator="\n", strip=True)
-        
-        if num_tokens(desc_text, model_name) <= MAX_TOKENS:
-            chunks = [desc_text]
-            ids = [job_id]
-        
-        else:
-            chunks = chunk_text(desc_text)
-            ids = [
-                str(uuid5(NAMESPACE_DNS, f"{job_key}-{i}"))
-                for i in range(len(chunks))
-            ]
-    
-    elif file_type == "pdf":
-        doc_id = str(uuid4())
-        text = doc.page_content
-        payload = metadata_func(doc.metadata, {})
-        
-        chunks = chunk_text(text)
-        ids = [doc_id]
-    
-    vectors = get_embeddings(chunks, model_name)
-    for pid, vec in zip(ids, vectors):
-        points.append(
-            PointStruct(
-                id = pid,
-                vector = vec,
-                payload = payload,
+    #? Points only carry what cards and filters need, the description goes to the document store
+    payload, document = split_job(job, descriptionPreview=text[:PREVIEW_CHARS], filters=normalized_filters(job))
+    
+    if len(chunks) == 1:
+        ids = [job_id]
+    
+    else:
+        ids = [
+            str(uuid5(NAMESPACE_DNS, f"{job_key}-{i}"))
+            for i in range(len(chunks))
+        ]
+    
+    #? Keyword vectors are built here in the workers, the parent only attaches them to points
+    return PreparedDoc(
+        [PendingChunk(pid, chunk.text, chunk.tokens, payload, sparse_vector(chunk.text)) for pid, chunk in zip(ids, chunks)],
+        document,
+        minhash(text),
+    )
+
+
+def prepare_pdf(doc, model_name: str) -> PreparedDoc:
+    """Chunk one page of a PDF, every chunk gets its own point"""
+    payload = metadata_func(doc.metadata, {})
+    chunks = chunker.chunk_text(doc.page_content, MAX_TOKENS, CHUNK_OVERLAP, model_name)
+    return PreparedDoc([PendingChunk(str(uuid4()), chunk.text, chunk.tokens, payload) for chunk in chunks], None)
+
+
+def iter_pdfs(paths: list[str], model_name: str):
+    """Yield the prepared pages of the PDF files, read in this process since they are few next to the job files"""
+    for path in paths:
+        if path.endswith(".pdf"):
+            loader, _ = get_loader(path)
+            for doc in loader.lazy_load():
+                yield prepare_pdf(doc, model_name)
+
+
+_worker_model = None
+
+
+def init_worker(model_name: str):
+    """Pool initializer, builds each worker's tokenizer and parser state once for its whole life"""
+    global _worker_model
+    _worker_model = model_name
+    chunker.get_encoding(model_name)
+    clean_description("<p>warm up</p>")
+
+
+def prepare_jobs(raw_jobs: list[bytes]) -> list[PreparedDoc]:
+    """Worker task: parse, clean and chunk a batch of raw job JSON records.
+    
+    Workers receive the raw bytes and tokenize the whole batch in one call, so the parent
+    process never builds Documents and each task amortizes its IPC over many jobs.
+    """
+    jobs = []
+    cleaned = []
+    for raw in raw_jobs:
+        try:
+            job = json.loads(raw)
+            cleaned.append(clean_description(job.get("description") or ""))
+            jobs.append(job)
+        except Exception as e:
+            logger.error(f"Skipping unreadable job record: {e}")
+    
+    chunked = chunker.chunk_texts([text for _, text in cleaned], MAX_TOKENS, CHUNK_OVERLAP, _worker_model)
+    prepared = []
+    for job, (html, text), chunks in zip(jobs, cleaned, chunked):
+        try:
+            prepared.append(prepare_job(job, html, text, chunks))
+        except Exception as e:
+            logger.error(f"Skipping job {job.get('jobkey')}: {e}")
+    return prepared
+
+
+def store_documents(prepared, flush_every: int = 100):
+    """Write prepared jobs to the document store, then yield their chunks.
+    
+    A job's document is always committed before its chunks move on, so no point is
+    upserted without the details behind it.
+    """
+    store = get_doc_store()
+    documents = []
+    chunks = []
+    for doc in prepared:
+        if doc.document is not None:
+            documents.append(doc.document)
+        chunks.extend(doc.chunks)
+        if len(documents) >= flush_every:
+            store.put_many(documents)
+            yield from chunks
+            documents = []
+            chunks = []
+    
+    if documents:
+        store.put_many(documents)
+    yield from chunks
+
+
+def embed_chunks(chunks: list[PendingChunk], model_name: str, profile: str = DEFAULT_PROFILE) -> list[PointStruct]:
+    """Embed chunks in provider-sized batches and scatter the vectors back to their point IDs"""
+    collection_profile = get_profile(profile)
+    points = []
+    for batch in pack_batches(chunks, model_name):
+        vectors = get_embeddings([chunk.text for chunk in batch], model_name)
+        for chunk, vec in zip(batch, vectors):
+            points.append(
+                PointStruct(
+                    id = chunk.id,
+                    vector = collection_profile.point_vector(vec, chunk.sparse),
+                    payload = {**chunk.payload, "chunkText": chunk.text},
+                )
             )
-        )
     
     return points
 
 
-def parallel_upsert(paths, collection, model_name):
-    docs = load_data(paths)
+async def aembed_chunks(chunks: list[PendingChunk], model_name: str, profile: str = DEFAULT_PROFILE) -> list[PointStruct]:
+    """Embed one packed batch of chunks through the async client and build its points"""
+    collection_profile = get_profile(profile)
+    tokens = {chunk.text: chunk.tokens for chunk in chunks}
+    vectors = await aget_embeddings([chunk.text for chunk in chunks], model_name, tokens)
+    return [
+        PointStruct(
+            id = chunk.id,
+            vector = collection_profile.point_vector(vec, chunk.sparse),
+            payload = {**chunk.payload, "chunkText": chunk.text},
+        )
+        for chunk, vec in zip(chunks, vectors)
+    ]
+
+
+def parallel_upsert(
+    paths,
+    collection,
+    model_name,
+    profile: str = DEFAULT_PROFILE,
+    processes: int = mp.cpu_count(),
+    max_in_flight: int | None = None,
+    jobs_per_task: int = JOBS_PER_TASK,
+    queue_size: int = 4,
+    bulk: bool = False,
+    upload_workers: int = 4,
+    prefer_grpc: bool | None = None,
+    dedupe: bool = True,
+    share_chunks: bool = True,
+):
+    """Stream documents through load -> clean/chunk -> embed -> upsert with bounded queues between stages.
+    `bulk` pauses indexing for full re-indexes, `dedupe` and `share_chunks` embed repeated jobs and chunks once."""
+    backend = get_backend(model_name)
+    prefer_grpc = QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc
+    qdrant_client = init_vectorDB(collection, model_name, profile, prefer_grpc)
+    if is_local():
+        #? The embedded client is not thread-safe, keep its writes on one thread
+        upload_workers = 1
+    uploader = BulkUploader(qdrant_client, collection, workers=upload_workers, grpc=prefer_grpc) if bulk else None
+    deduplicator = Deduplicator() if dedupe else None
+    chunk_store = ChunkStore(qdrant_client, collection) if share_chunks else None
+    stop = threading.Event()
+    embed_queue = queue.Queue(maxsize=queue_size)
+    upsert_queue = queue.Queue(maxsize=queue_size)
+    counts = {"chunks": 0, "points": 0}
+    
+    async def embed_batch(batch):
+        counts["chunks"] += len(batch)
+        return await aembed_chunks(batch, model_name, profile)
+    
+    def upsert_points(points):
+        if uploader is not None:
+            uploader.add(points)
+        else:
+            for i in range(0, len(points), BATCH_SIZE):
+                batch = points[i:i+BATCH_SIZE]
+                qdrant_client.upsert(collection_name=collection, points=batch)
+        counts["points"] += len(points)
+        logger.info(f"Upserted {counts['points']} points into {collection}")
+    
+    stages = [
+        AsyncStage("embed", embed_batch, embed_queue, upsert_queue, stop, concurrency=backend.concurrency, on_close=close_async_clients),
+        Stage("upsert", upsert_points, upsert_queue, None, stop),
+    ]
+    for stage in stages:
+        stage.start()
+    
+    try:
+        #? Load the tokenizer and parser here first, so a missing encoding fails once with its error
+        init_worker(model_name)
+        pool = get_pool(processes, init_worker, (model_name,))
+        max_in_flight = max_in_flight or processes * 2
+        tasks = (list(batch) for batch in batched(iter_raw_jobs(paths), jobs_per_task))
+        prepared = (doc for docs in bounded_imap_unordered(pool, prepare_jobs, tasks, max_in_flight, check_pool) for doc in docs)
+        prepared = chain(prepared, iter_pdfs(paths, model_name))
+        if deduplicator is not None:
+            prepared = deduplicator.filter(prepared)
+        chunks = store_documents(prepared)
+        if chunk_store is not None:
+            chunks = chunk_store.filter(chunks)
+        
+        #? Embed across documents so each request carries as many chunks as the provider allows
+        for batch in pack_batches(chunks, model_name):
+            put(embed_queue, batch, stop)
+        put(embed_queue, DONE, stop)
+    
+    except PipelineError:
+        pass
+    
+    except BaseException:
+        stop.set()
+        raise
+    
+    finally:
+        for stage in stages:
+            stage.join()
+        if uploader is not None:
+            uploader.finish()
+        #? Cached searches were ranked against the old points
+        get_search_cache().invalidate(collection)
+    
+    for stage in stages:
+        if stage.error is not None:
+            raise stage.error
     
-    with Pool(processes=mp.cpu_count()) as pool:
-        results = pool.map(partial(process_doc, model_name=model_name), docs)
-    flat_points = [point for points in results for point in points]
+    #? Shared chunks go last, merging duplicates matches on scalar jobkeys
+    if deduplicator is not None:
+        deduplicator.apply(qdrant_client, collection)
+    if chunk_store is not None:
+        chunk_store.apply(qdrant_client, collection)
+    if deduplicator is not None or chunk_store is not None:
+        get_search_cache().invalidate(collection)
     
-    qdrant_client = init_vectorDB(collection)
-    for i in range(0, len(flat_points), BATCH_SIZE):
-        batch = flat_points[i:i+BATCH_SIZE]
-        qdrant_client.upsert(collection_name=collection, points=batch)
+    stats = get_cache().stats()
+    logger.info(f"Embedded {counts['chunks']} chunks, cache: {stats['hits']} hits, {stats['misses']} misses")
+    if backend.summary():
+        logger.info(f"Embedding requests: {backend.summary()}")
 
 
 if __name__ == "__main__":
@@ -229,7 +487,7 @@ if __name__ == "__main__":
     data_dir = os.path.join(BASE_DIR, "data/processed_data/ds_jobs")
     paths = input_files(data_dir)
     
-    model_name = "text-embedding-3-large"
+    model_name = DEFAULT_MODEL
     collection = "ds_jobs"
     
-    parallel_upsert(paths, collection, model_name)
\ No newline at end of file
+    parallel_upsert(paths, collection, model_name, bulk=True)
\ No newline at end of file
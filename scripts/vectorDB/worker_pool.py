@@ -0,0 +1,72 @@
+import atexit
+import queue
+import multiprocessing as mp
+
+from typing import Callable
+from multiprocessing.pool import Pool
+from loguru import logger
+
+
+_pool = None
+_pool_key = None
+_failures = None
+
+
+def start_worker(failures, initializer: Callable, initargs: tuple):
+    """Run the pool initializer, reporting a failure to the parent before the worker exits"""
+    try:
+        initializer(*initargs)
+    except BaseException as e:
+        failures.put(f"{type(e).__name__}: {e}")
+        raise
+
+
+def get_pool(processes: int, initializer: Callable, initargs: tuple = ()) -> Pool:
+    """Return the long-lived worker pool, only starting a new one when its configuration changes.
+
+    Workers run `initializer` once when they start, so tokenizers and other per-process
+    state are built once per worker instead of once per task, and survive across runs.
+    """
+    global _pool, _pool_key, _failures
+    key = (processes, initializer, initargs)
+    if _pool is not None and _pool_key == key:
+        return _pool
+
+    close_pool()
+    logger.info(f"Starting {processes} ingestion workers")
+    context = mp.get_context("spawn")
+    _failures = context.Queue()
+    _pool = context.Pool(processes=processes, initializer=start_worker, initargs=(_failures, initializer, initargs))
+    _pool_key = key
+    return _pool
+
+
+def check_pool():
+    """Raise if a worker failed to start.
+
+    Pool replaces a worker whose initializer raised with a new one that fails the same way,
+    forever, and tasks sent to it never finish. Callers waiting on results poll this instead.
+    """
+    if _failures is None:
+        return
+    try:
+        error = _failures.get_nowait()
+    except queue.Empty:
+        return
+    global _pool, _pool_key
+    _pool.terminate()
+    _pool = None
+    _pool_key = None
+    raise RuntimeError(f"Ingestion worker failed to start: {error}")
+
+
+def close_pool():
+    global _pool, _pool_key
+    if _pool is not None:
+        _pool.close()
+        _pool.join()
+    _pool = None
+    _pool_key = None
+
+
+atexit.register(close_pool)
@@ -107,15 +107,15 @@ def load_resume(resume_file):
     return content, vector
 
 
-@st.cache_data(show_spinner=False)
-def get_job_list(resume_vector, filter_dict):
-    job_list = vs.vector_search(resume_vector, filter_dict)
+#? Results are cached in the vectorDB layer by resume fingerprint and filters, shared across sessions and restarts
+def get_job_list(resume_vector, filter_dict, resume_content=None):
+    #? Every role family collection is searched at once, see CVEC_SEARCH_COLLECTIONS
+    job_list = vs.federated_search(resume_vector, filter_dict, query_text=resume_content)
     return job_list
 
 
-@st.cache_data(show_spinner=False)
-def get_job_recommendations(resume_vector, filter_dict):
-    job_list = get_job_list(resume_vector, filter_dict)
+def get_job_recommendations(resume_vector, filter_dict, resume_content=None):
+    job_list = get_job_list(resume_vector, filter_dict, resume_content)
     
     def parse_job(job):
         job_data = {}
@@ -155,8 +155,8 @@ def filter_job_list(resume_vector, filter_dict):
 
 
 @st.cache_data(show_spinner=False)
-def get_job_description(job: dict) -> str:
-    return job.get("jobDescription")
+def get_job_description(jobkey: str) -> str:
+    return vs.get_job_description(jobkey)
 
 
 @st.cache_data(show_spinner=False)
@@ -169,7 +169,8 @@ def click_button(desc_key):
 
 
 def change_job(job):
-    st.session_state["selected_job"] = job
+    #? Cards only carry the search payload, pull the full description in once a job is picked
+    st.session_state["selected_job"] = {**job, **vs.get_job_details(job.get("jobkey"))}
 
 
 def main():
@@ -224,7 +225,7 @@ def main():
             "filter_job_type": job_type_input or None,
         }
         
-        jobCard_list = get_job_recommendations(st.session_state["resume_vector"], filter_dict)
+        jobCard_list = get_job_recommendations(st.session_state["resume_vector"], filter_dict, st.session_state.get("resume_content"))
         with st.container():
             st.write("<div class='job-cards-container'/>", unsafe_allow_html=True)
             for job in jobCard_list:
@@ -246,6 +247,10 @@ def main():
                             st.write(f"<div class='job-type'>Job Type: 💼 {job_type}</div>", unsafe_allow_html=True)
                         if job.get("locationInfo"):
                             location_info = job.get("locationInfo")
+                            #? Near-duplicate postings are merged into one card that lists its other locations
+                            other_locations = len(job.get("locations") or []) - 1
+                            if other_locations > 0:
+                                location_info = f"{location_info} (+{other_locations} more)"
                             st.write(f"<div class='job-location'>Location: 📍 {location_info}</div>", unsafe_allow_html=True)
                     
                     with col2:
@@ -255,16 +260,16 @@ def main():
                         resume_polish = st.button("Resume Polish", key=f"resume-polish-job-btn-{job_id}", on_click=partial(change_job, job), type="primary")
                         mock_interview = st.button("Mock Interview", key=f"mock-interview-job-btn-{job_id}", on_click=partial(change_job, job), type="primary")
                         
+                        #? on_click has already stored the selected job with its full details
                         if resume_polish:
-                            st.session_state["selected_job"] = job
                             st.switch_page("web/resume_q&a.py")
                         elif mock_interview:
-                            st.session_state["selected_job"] = job
                             st.switch_page("web/mock_interview.py")
                         
-                    if get_job_description(job):
-                        job_description = get_job_description(job)
-                        short_desc = get_short_desc(job_description)
+                    #? Collapsed cards show the chunk that matched the resume best, the full description loads on "read more"
+                    preview = job.get("chunkText") or job.get("descriptionPreview")
+                    if preview:
+                        short_desc = get_short_desc(preview)
                         
                         desc_key = f"job-description-{job_id}"
                         if desc_key not in st.session_state:
@@ -276,6 +281,7 @@ def main():
                             st.write("<div class='job-description-container'>", unsafe_allow_html=True)
                             
                             if st.session_state[desc_key]:
+                                job_description = get_job_description(job.get("jobkey"))
                                 st.write(f"<div class='job-description'>{job_description}", unsafe_allow_html=True)
                             else:
                                 st.write(f"<div class='job-description'>{short_desc}", unsafe_allow_html=True)
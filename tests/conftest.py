@@ -0,0 +1,76 @@
+import os
+import json
+import tempfile
+
+import pytest
+import tiktoken
+
+
+#* Every store goes to a scratch directory and Qdrant runs embedded in memory, set before vectorDB is imported
+SCRATCH = tempfile.mkdtemp(prefix="cvec-tests-")
+os.environ.setdefault("CVEC_QDRANT_PATH", ":memory:")
+os.environ.setdefault("CVEC_EMBED_CACHE", os.path.join(SCRATCH, "embeddings.sqlite"))
+os.environ.setdefault("CVEC_SEARCH_CACHE", os.path.join(SCRATCH, "search.sqlite"))
+os.environ.setdefault("CVEC_DOC_STORE", os.path.join(SCRATCH, "jobs.sqlite"))
+os.environ.setdefault("CVEC_LOCAL_INDEX_DIR", os.path.join(SCRATCH, "local_index"))
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+JOBS_FIXTURE = os.path.join(FIXTURES, "jobs.jsonl")
+MODEL = "local-hashing"
+
+
+@pytest.fixture
+def byte_encoding(monkeypatch):
+    """A one-token-per-byte tiktoken encoding, so chunking runs without downloading cl100k_base"""
+    from vectorDB import chunker
+
+    encoding = tiktoken.Encoding(
+        "bytes",
+        pat_str = r"\S+|\s+",
+        mergeable_ranks = {bytes([i]): i for i in range(256)},
+        special_tokens = {},
+    )
+    monkeypatch.setattr(chunker, "get_encoding", lambda model_name="": encoding)
+    return encoding
+
+
+@pytest.fixture
+def fixture_jobs() -> list[dict]:
+    with open(JOBS_FIXTURE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def prepared_jobs(byte_encoding, fixture_jobs):
+    """The fixture jobs cleaned, chunked and hashed the way the ingestion workers do it"""
+    from vectorDB import vector_store
+
+    vector_store.init_worker(MODEL)
+    return vector_store.prepare_jobs([json.dumps(job).encode("utf-8") for job in fixture_jobs])
+
+
+@pytest.fixture
+def ingest(prepared_jobs):
+    """Load the fixture jobs, or some prepared `jobs`, into a collection of the in-memory Qdrant the way parallel_upsert does"""
+    from vectorDB import vector_store
+    from vectorDB.chunk_store import ChunkStore
+    from vectorDB.near_duplicates import Deduplicator
+
+    def load(collection: str, dedupe: bool = True, share_chunks: bool = True, jobs: list | None = None):
+        client = vector_store.init_vectorDB(collection, MODEL)
+        deduplicator = Deduplicator() if dedupe else None
+        chunk_store = ChunkStore(client, collection) if share_chunks else None
+        prepared = prepared_jobs if jobs is None else jobs
+        if deduplicator is not None:
+            prepared = deduplicator.filter(prepared)
+        chunks = vector_store.store_documents(prepared)
+        if chunk_store is not None:
+            chunks = chunk_store.filter(chunks)
+        client.upsert(collection_name=collection, points=vector_store.embed_chunks(list(chunks), MODEL))
+        if deduplicator is not None:
+            deduplicator.apply(client, collection)
+        if chunk_store is not None:
+            chunk_store.apply(client, collection)
+        return client
+
+    return load
@@ -0,0 +1,46 @@
+from vectorDB.chunk_store import chunk_id, is_shared
+
+
+def stored_chunks(client, collection: str) -> tuple[dict, list]:
+    """Chunk IDs each job is listed on, and the shared points"""
+    points, _ = client.scroll(collection, limit=1000, with_payload=True)
+    jobs = {}
+    for point in points:
+        jobkeys = point.payload["jobkey"] if is_shared(point.payload) else [point.payload["jobkey"]]
+        for jobkey in jobkeys:
+            jobs.setdefault(jobkey, set()).add(str(point.id))
+    return jobs, [point for point in points if is_shared(point.payload)]
+
+
+def expected_chunks(prepared) -> dict:
+    return {doc.chunks[0].payload["jobkey"]: {chunk_id(chunk.text) for chunk in doc.chunks} for doc in prepared if doc.chunks}
+
+
+def test_chunk_id_ignores_case_and_whitespace():
+    assert chunk_id("We are an  Equal\nOpportunity employer.") == chunk_id("we are an equal opportunity employer.")
+    assert chunk_id("Benefits include dental.") != chunk_id("Benefits include vision.")
+
+
+def test_shared_chunks_list_every_job(ingest, prepared_jobs, fixture_jobs):
+    client = ingest("test_chunk_lists", dedupe=False)
+    jobs, shared = stored_chunks(client, "test_chunk_lists")
+    assert jobs == expected_chunks(prepared_jobs)
+
+    companies = {job["jobkey"]: job["companyName"] for job in fixture_jobs}
+    assert shared
+    for point in shared:
+        assert len(point.payload["jobkey"]) == len(set(point.payload["jobkey"])) > 1
+        assert point.payload["boilerplate"] == (len({companies[jobkey] for jobkey in point.payload["jobkey"]}) > 3)
+    assert any(point.payload["boilerplate"] for point in shared)
+    assert not all(point.payload["boilerplate"] for point in shared)
+
+
+def test_incremental_load_keeps_earlier_jobs(ingest, prepared_jobs):
+    client = ingest("test_chunk_reload", dedupe=False)
+    before = stored_chunks(client, "test_chunk_reload")
+
+    #? A later run with a few of the jobs overwrites their chunks' points, earlier jobs must stay listed
+    ingest("test_chunk_reload", dedupe=False, jobs=prepared_jobs[5:8])
+    after = stored_chunks(client, "test_chunk_reload")
+    assert after[0] == before[0] == expected_chunks(prepared_jobs)
+    assert {str(p.id): p.payload["boilerplate"] for p in after[1]} == {str(p.id): p.payload["boilerplate"] for p in before[1]}
@@ -0,0 +1,94 @@
+import pytest
+
+from vectorDB import chunker
+
+
+def word_offsets(text: str) -> list[int]:
+    """One token per word and per run of whitespace, like the \\S+|\\s+ test encoding"""
+    offsets = []
+    for i, ch in enumerate(text):
+        if i == 0 or ch.isspace() != text[i - 1].isspace():
+            offsets.append(i)
+    return offsets
+
+
+def sentence(label: str, words: int) -> str:
+    return " ".join([label] * (words - 1) + [label + "."]) + " "
+
+
+def test_split_sentences_keeps_delimiters_with_previous_sentence():
+    text = "First one. Second one!\n\nThird one? Tail"
+    spans = chunker.split_sentences(text)
+    assert [text[start:end] for start, end in spans] == ["First one. ", "Second one!\n\n", "Third one? ", "Tail"]
+
+
+def test_split_sentences_skips_blank_runs():
+    assert chunker.split_sentences("\n\n  \n") == []
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(20, 8), (40, 16), (64, 0)])
+def test_chunks_stay_within_limit_and_cover_text(chunk_size, chunk_overlap):
+    text = "".join(sentence(f"s{i}", 3 + i % 7) for i in range(40))
+    offsets = word_offsets(text)
+    chunks = chunker.chunk_tokens(text, offsets, chunk_size, chunk_overlap)
+
+    assert chunks
+    assert all(chunk.tokens <= chunk_size for chunk in chunks)
+    assert chunks[0].start == 0
+    assert chunks[-1].end == len(text)
+    #? Chunks move forward and leave no gap between them
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.start < chunk.start <= previous.end
+        assert chunk.end > previous.end
+
+
+def test_token_counts_match_offsets():
+    text = "".join(sentence(f"s{i}", 5) for i in range(12))
+    offsets = word_offsets(text)
+    for chunk in chunker.chunk_tokens(text, offsets, 24, 10):
+        tokens = sum(1 for offset in offsets if chunk.start <= offset < chunk.end)
+        assert chunk.tokens == tokens
+
+
+def test_overlap_repeats_trailing_sentences():
+    a, b, c, d = (sentence(label, 5) for label in "abcd")
+    text = a + b + c + d
+    chunks = chunker.chunk_tokens(text, word_offsets(text), 30, 10)
+    #? Each sentence is 10 tokens, chunks hold three and carry the last one over
+    assert [chunk.text for chunk in chunks] == [(a + b + c).strip(), (c + d).strip()]
+
+
+def test_long_sentence_is_cut_into_windows():
+    text = sentence("long", 50)
+    offsets = word_offsets(text)
+    chunks = chunker.chunk_tokens(text, offsets, 30, 10)
+    assert len(chunks) > 1
+    assert all(chunk.tokens <= 30 for chunk in chunks)
+    assert chunks[-1].end == len(text)
+
+
+def test_no_chunk_is_contained_in_another():
+    #? A short pair before an oversized sentence must not come back as an overlap-only chunk
+    a, b, c = sentence("a", 50), sentence("b", 50), sentence("c", 250)
+    text = a + b + c
+    chunks = chunker.chunk_tokens(text, word_offsets(text), 230, 128)
+    assert chunks[0].text == (a + b).strip()
+    for i, chunk in enumerate(chunks):
+        for j, other in enumerate(chunks):
+            if i != j:
+                assert not (other.start <= chunk.start and chunk.end <= other.end)
+
+
+def test_chunk_text_returns_short_text_whole(byte_encoding):
+    assert chunker.chunk_text("short text", 230, 128) == [chunker.Chunk("short text", 0, 10, 10)]
+    assert chunker.chunk_text("   ", 230, 128) == []
+
+
+def test_chunk_texts_matches_chunk_text(byte_encoding):
+    texts = ["".join(sentence(f"w{i}", 6) for i in range(n)) for n in (1, 8, 30)]
+    assert chunker.chunk_texts(texts, 60, 20) == [chunker.chunk_text(text, 60, 20) for text in texts]
+
+
+def test_truncate_text(byte_encoding):
+    assert chunker.truncate_text("abcdef", 10) == ("abcdef", 6)
+    assert chunker.truncate_text("abcdef", 4) == ("abcd", 4)
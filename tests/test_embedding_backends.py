@@ -0,0 +1,53 @@
+import asyncio
+
+from vectorDB.embedding_backends import OllamaBackend, OpenAIBackend, close_async_clients, get_backend
+from vectorDB.ingest_pipeline import DONE, AsyncStage
+
+from conftest import MODEL
+
+
+def test_hashing_backend_is_deterministic_and_normalized():
+    backend = get_backend(MODEL)
+    a, b, c = backend.embed(["python and sql", "python and sql", "nursing shifts"])
+    assert a == b
+    assert abs(sum(v * v for v in a) - 1.0) < 1e-9
+    assert sum(x * y for x, y in zip(a, c)) < sum(x * y for x, y in zip(a, b))
+
+
+def test_async_clients_are_closed_with_their_loop(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    openai = OpenAIBackend("text-embedding-3-large", 3072)
+    ollama = OllamaBackend("nomic-embed-text", 768)
+    monkeypatch.setattr("vectorDB.embedding_backends.BACKENDS", {"openai": openai, "ollama": ollama})
+
+    async def run():
+        clients = openai.get_async_client(), ollama.get_async_client()
+        await close_async_clients()
+        return clients
+
+    openai_client, ollama_client = asyncio.run(run())
+    assert openai_client.client.is_closed()
+    assert ollama_client.is_closed
+    assert len(openai.async_clients) == len(ollama.async_clients) == 0
+
+
+def test_async_stage_closes_clients_when_it_ends():
+    import queue
+    import threading
+
+    closed = []
+
+    async def on_close():
+        closed.append(asyncio.get_running_loop())
+
+    async def identity(item):
+        return item
+
+    inbox = queue.Queue()
+    stage = AsyncStage("embed", identity, inbox, None, threading.Event(), on_close=on_close)
+    stage.start()
+    inbox.put([1])
+    inbox.put(DONE)
+    stage.join(timeout=10)
+    assert not stage.is_alive()
+    assert len(closed) == 1
@@ -0,0 +1,61 @@
+import pytest
+
+from qdrant_client import models
+
+from vectorDB import filters
+
+
+@pytest.mark.parametrize("field,value,expected", [
+    ("city", "  San   Francisco ", "san francisco"),
+    ("city", "NYC", "new york"),
+    ("city", "Bay Area", "san francisco bay area"),
+    ("city", "Washington, D.C.", "washington"),
+    ("city", "St. Louis", "st louis"),
+    ("state", "California", "ca"),
+    ("state", "TX", "tx"),
+    ("jobType", "Full-Time", "full-time"),
+    ("city", "", None),
+    ("city", None, None),
+    ("city", " ., ", None),
+])
+def test_normalize_value(field, value, expected):
+    assert filters.normalize_value(field, value) == expected
+
+
+def test_normalized_filter_dict_drops_empty_and_unknown_inputs():
+    filter_dict = {"filter_city": "SF", "filter_state": "", "filter_job_type": None, "unknown": "x"}
+    assert filters.normalized_filter_dict(filter_dict) == {"filter_city": "san francisco"}
+
+
+def test_normalized_filters_of_a_job():
+    job = {"jobType": "Full-time", "locationInfo": {"jobLocationCity": "NYC", "jobLocationState": "New York"}}
+    assert filters.normalized_filters(job) == {"jobType": "full-time", "state": "ny", "city": "new york"}
+    assert filters.normalized_filters({}) == {"jobType": None, "state": None, "city": None}
+
+
+def test_matches_filters():
+    stored = {"jobType": "full-time", "state": "tx", "city": "austin"}
+    assert filters.matches_filters(stored, {})
+    assert filters.matches_filters(stored, {"filter_state": "Texas", "filter_city": "Austin"})
+    assert not filters.matches_filters(stored, {"filter_city": "Seattle"})
+
+
+def test_matches_filters_on_merged_values():
+    stored = {"jobType": "full-time", "state": ["tx", "wa"], "city": ["austin", "seattle"]}
+    assert filters.matches_filters(stored, {"filter_city": "seattle", "filter_state": "Washington"})
+    assert not filters.matches_filters(stored, {"filter_city": "denver"})
+
+
+def test_search_filter_matches_normalized_keys(monkeypatch):
+    from vectorDB import chunk_store, vector_search
+
+    monkeypatch.setattr(chunk_store, "SKIP_BOILERPLATE", True)
+    query_filter = vector_search.search_filter({"filter_city": "NYC", "filter_state": "", "filter_job_type": "Contract"})
+    assert query_filter.must == [
+        models.FieldCondition(key="filters.city", match=models.MatchValue(value="new york")),
+        models.FieldCondition(key="filters.jobType", match=models.MatchValue(value="contract")),
+    ]
+    assert query_filter.must_not == [models.FieldCondition(key="boilerplate", match=models.MatchValue(value=True))]
+
+    monkeypatch.setattr(chunk_store, "SKIP_BOILERPLATE", False)
+    assert vector_search.search_filter({}).must_not == []
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from vectorDB.html_clean import DROP_TAGS, clean_description, clean_description_bs4, safe_url
+
+from conftest import JOBS_FIXTURE
+
+
+@pytest.mark.parametrize("html", [
+    '<a href="javascript:alert(1)">x</a>',
+    '<a href=" JaVa&#9;Script:alert(1)">x</a>',
+    '<a href="vbscript:msgbox(1)">x</a>',
+    '<a href="data:text/html,&lt;script&gt;alert(1)&lt;/script&gt;">x</a>',
+    '<img src="data:image/svg+xml;base64,PHN2Zz4=">x',
+    '<svg><a xlink:href="javascript:alert(1)">x</a></svg>',
+    '<a xlink:href="javascript:alert(1)">x</a>',
+    '<math><mi xlink:href="javascript:alert(1)">x</mi></math>',
+    '<p onclick="alert(1)" style="background:url(javascript:alert(1))">x</p>',
+    '<meta http-equiv="refresh" content="0;url=javascript:alert(1)">x',
+    '<form action="javascript:alert(1)"><button formaction="javascript:alert(1)">x</button></form>',
+    '<iframe srcdoc="&lt;script&gt;alert(1)&lt;/script&gt;"></iframe>x',
+    '<details open ontoggle="alert(1)">x</details>',
+])
+def test_unsafe_markup_is_removed(html):
+    display, _ = clean_description(html)
+    lowered = display.lower()
+    for unsafe in ("javascript", "vbscript", "data:", "xlink", "<svg", "<math", "<meta", "<iframe", " on", "style="):
+        assert unsafe not in lowered
+
+
+@pytest.mark.parametrize("url,safe", [
+    ("https://example.com/jobs?id=1", True),
+    ("http://example.com", True),
+    ("mailto:jobs@example.com", True),
+    ("/careers/apply", True),
+    ("#benefits", True),
+    ("javascript:alert(1)", False),
+    ("java\tscript:alert(1)", False),
+    ("\x01javascript:alert(1)", False),
+    ("data:text/html,hi", False),
+    ("ftp://example.com", False),
+])
+def test_safe_url(url, safe):
+    assert safe_url(url) is safe
+
+
+def test_safe_markup_is_kept():
+    html = '<p>Apply <a href="https://example.com/apply" title="Apply">here</a> or <a href="mailto:jobs@example.com">mail us</a></p><br><br><br><ul><li>SQL</li></ul>'
+    display, text = clean_description(html)
+    assert display == '<p>Apply <a href="https://example.com/apply" title="Apply">here</a> or <a href="mailto:jobs@example.com">mail us</a></p><br><ul><li>SQL</li></ul>'
+    assert text == "Apply\nhere\nor\nmail us\nSQL"
+
+
+def test_dropped_elements_keep_text_apart():
+    _, text = clean_description("<p>Before<script>var x = 1;</script>after<!-- note -->end</p>")
+    assert text == "Before\nafter\nend"
+
+
+def test_unknown_elements_are_unwrapped():
+    display, text = clean_description("<font color=red>Hello <custom>there</custom></font>")
+    assert display == "Hello there"
+    assert text == "Hello\nthere"
+
+
+def fixture_descriptions() -> list[str]:
+    with open(JOBS_FIXTURE, encoding="utf-8") as f:
+        return [json.loads(line)["description"] for line in f]
+
+
+@pytest.mark.parametrize("html", [
+    "<p>Plain &amp; simple</p>",
+    "<div><h2>Role</h2><ul><li>Python</li><li>SQL <b>and</b> dbt</li></ul></div>",
+    "Line one<br><br>Line two<br/>Line three",
+    "<table><tr><td>Salary</td><td>$120k&nbsp;&ndash;&nbsp;$150k</td></tr></table>",
+    "<p>Café <font>culture</font> <span>matters</span></p>",
+    *[html for html in fixture_descriptions() if not any(f"<{tag}" in html for tag in DROP_TAGS)],
+])
+def test_text_matches_beautifulsoup(html):
+    assert clean_description(html)[1] == clean_description_bs4(html)[1]
+
+
+def test_empty_description():
+    assert clean_description("") == ("", "")
+    assert clean_description("   ") == ("", "")
@@ -0,0 +1,101 @@
+import queue
+import threading
+
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
+from vectorDB.ingest_pipeline import DONE, AsyncStage, PipelineError, Stage, bounded_imap_unordered, put
+
+
+def run_pipeline(stages, inbox, stop, items):
+    for stage in stages:
+        stage.start()
+    try:
+        for item in items:
+            put(inbox, item, stop)
+        put(inbox, DONE, stop)
+    except PipelineError:
+        pass
+    for stage in stages:
+        stage.join(timeout=10)
+        assert not stage.is_alive()
+
+
+def test_stages_pass_items_through():
+    stop = threading.Event()
+    inbox, middle, outbox = queue.Queue(1), queue.Queue(1), queue.Queue()
+
+    async def double(item):
+        return [x * 2 for x in item]
+
+    stages = [AsyncStage("double", double, inbox, middle, stop, concurrency=2), Stage("collect", outbox.put, middle, None, stop)]
+    run_pipeline(stages, inbox, stop, [[i] for i in range(10)])
+    assert sorted(outbox.get_nowait()[0] for _ in range(10)) == [i * 2 for i in range(10)]
+    assert [stage.error for stage in stages] == [None, None]
+
+
+def test_failed_stage_keeps_its_error():
+    #? The upstream stage is stopped while blocked on the full queue, it must not replace the real error
+    stop = threading.Event()
+    inbox, middle = queue.Queue(1), queue.Queue(1)
+
+    async def embed(item):
+        return item
+
+    def upsert(item):
+        raise ConnectionError("qdrant down")
+
+    stages = [AsyncStage("embed", embed, inbox, middle, stop, concurrency=2), Stage("upsert", upsert, middle, None, stop)]
+    run_pipeline(stages, inbox, stop, [[i] for i in range(20)])
+    assert stages[0].error is None
+    assert isinstance(stages[1].error, ConnectionError)
+
+
+def test_failed_async_stage_keeps_its_error():
+    stop = threading.Event()
+    inbox, middle, outbox = queue.Queue(1), queue.Queue(1), queue.Queue(1)
+
+    async def embed(item):
+        raise TimeoutError("embedding timed out")
+
+    stages = [Stage("clean", lambda item: item, inbox, middle, stop), AsyncStage("embed", embed, middle, outbox, stop)]
+    run_pipeline(stages, inbox, stop, [[i] for i in range(20)])
+    assert stages[0].error is None
+    assert isinstance(stages[1].error, TimeoutError)
+
+
+def test_bounded_imap_unordered_bounds_pending_tasks():
+    pending = []
+    lock = threading.Lock()
+    running = [0]
+
+    def task(x):
+        with lock:
+            running[0] += 1
+            pending.append(running[0])
+        if x == 3:
+            raise ValueError("bad document")
+        with lock:
+            running[0] -= 1
+        return x
+
+    def inputs():
+        for x in range(20):
+            yield x
+
+    with ThreadPool(8) as pool:
+        results = sorted(bounded_imap_unordered(pool, task, inputs(), max_in_flight=2))
+    assert results == [x for x in range(20) if x != 3]
+    assert max(pending) <= 2
+
+
+def test_bounded_imap_unordered_raises_from_check():
+    def check():
+        raise RuntimeError("worker failed to start")
+
+    with ThreadPool(1) as pool:
+        blocker = threading.Event()
+        with pytest.raises(RuntimeError, match="failed to start"):
+            list(bounded_imap_unordered(pool, lambda x: blocker.wait(5), range(3), max_in_flight=1, check=check))
+        blocker.set()
@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+from vectorDB import json_stream
+
+
+RECORDS = [
+    {"jobkey": "a", "description": "<p>Brackets ] } [ { inside a string</p>"},
+    {"jobkey": "b", "description": 'Escaped \\" quote and a backslash \\\\', "tags": [1, [2, 3], {"x": "]"}]},
+    {"jobkey": "c", "locationInfo": {"jobLocationCity": "Austin", "jobLocationState": "Texas"}},
+    {"jobkey": "d", "description": "Unicode café — 中文"},
+]
+
+
+def records(data: bytes, read_size: int) -> list:
+    return [json.loads(raw) for raw in json_stream.iter_array_records(io.BytesIO(data), read_size)]
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 7, 16, 64, 1 << 20])
+def test_array_records_match_json_loads(read_size):
+    data = json.dumps(RECORDS, ensure_ascii=False, indent=2).encode("utf-8")
+    assert records(data, read_size) == json.loads(data)
+
+
+@pytest.mark.parametrize("data", [b"[]", b"  [ ]  ", b"[\n]\n"])
+def test_empty_array(data):
+    assert records(data, 4) == []
+
+
+def test_yields_raw_bytes():
+    raws = list(json_stream.iter_array_records(io.BytesIO(b'[{"a": 1}, {"b": "}"}]'), 5))
+    assert raws == [b'{"a": 1}', b'{"b": "}"}']
+
+
+@pytest.mark.parametrize("data", [b'{"a": 1}', b'[{"a": 1}', b'[{"a": "unterminated'])
+def test_malformed_input_raises(data):
+    with pytest.raises(ValueError):
+        records(data, 3)
+
+
+def test_iter_records_reads_both_formats(tmp_path):
+    array = tmp_path / "jobs.json"
+    array.write_text(json.dumps(RECORDS), encoding="utf-8")
+    lines = tmp_path / "jobs.jsonl"
+    lines.write_text("\n".join(json.dumps(record) for record in RECORDS) + "\n\n", encoding="utf-8")
+
+    assert list(json_stream.iter_jobs(str(array), read_size=8)) == RECORDS
+    assert list(json_stream.iter_jobs(str(lines))) == RECORDS
@@ -0,0 +1,58 @@
+import pytest
+
+from vectorDB import vector_search
+from vectorDB.local_index import LocalIndex, export_collection
+
+from conftest import MODEL
+
+
+QUERIES = [
+    "Spark and dbt pipelines on Snowflake",
+    "deep learning models for natural language processing",
+    "SQL dashboards for retail merchandising",
+    "machine learning engineer deploying models",
+]
+FILTERS = [{}, {"filter_state": "California"}, {"filter_city": "Seattle"}, {"filter_city": "nowhere"}]
+
+
+@pytest.fixture
+def collections(ingest, tmp_path, monkeypatch):
+    """The fixture jobs in Qdrant and exported to a local index under the same name"""
+    from vectorDB import local_index
+
+    collection = "test_ranking"
+    client = ingest(collection)
+    monkeypatch.setattr(local_index, "LOCAL_INDEX_DIR", str(tmp_path))
+    export_collection(client, collection, dtype="float32")
+    return collection
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("filter_dict", FILTERS)
+def test_local_index_ranks_like_qdrant(collections, monkeypatch, query, filter_dict):
+    embeddings = vector_search.get_embeddings([query], MODEL)
+
+    monkeypatch.setattr(vector_search, "SEARCH_ENGINE", "qdrant")
+    expected = vector_search.vector_search(embeddings, filter_dict, collections, k=10, use_cache=False)
+    monkeypatch.setattr(vector_search, "SEARCH_ENGINE", "local")
+    actual = vector_search.vector_search(embeddings, filter_dict, collections, k=10, use_cache=False)
+
+    assert [p.score for p in actual] == pytest.approx([p.score for p in expected], abs=1e-5)
+    #? Jobs sharing their best chunk tie, so only the set of jobs at each score is compared,
+    #? and a tie at the cutoff may keep different jobs
+    cutoff = round(expected[-1].score, 4) if expected else None
+    key = lambda p: (round(p.score, 4), p.payload["jobkey"])
+    assert sorted(k for k in map(key, actual) if k[0] != cutoff) == sorted(k for k in map(key, expected) if k[0] != cutoff)
+    if filter_dict.get("filter_city") == "nowhere":
+        assert actual == []
+
+
+def test_local_index_filters_merged_locations(collections, tmp_path):
+    index = LocalIndex(str(tmp_path / collections))
+    embeddings = vector_search.get_embeddings(["data engineer"], MODEL)
+    for city in ("Austin", "Seattle"):
+        hits = index.search(embeddings, vector_search.search_filter({"filter_city": city}), 50)
+        assert hits
+        for p in hits:
+            cities = p.payload.get("locations") or [p.payload["locationInfo"]]
+            assert city in [location["jobLocationCity"] for location in cities]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from vectorDB.doc_store import get_doc_store
+from vectorDB.near_duplicates import DuplicateIndex, minhash, similarity
+
+
+DESCRIPTION = " ".join(
+    f"Sentence {i} describes pipelines, dashboards and models the team number {i} builds on Spark and dbt."
+    for i in range(20)
+)
+
+
+def test_minhash_of_identical_and_empty_text():
+    assert np.array_equal(minhash(DESCRIPTION), minhash(DESCRIPTION.upper()))
+    assert similarity(minhash(DESCRIPTION), minhash(DESCRIPTION)) == 1.0
+    assert minhash("  ... ") is None
+
+
+def test_similarity_tracks_overlap():
+    repost = DESCRIPTION.replace("Sentence 7 describes", "This week the hiring manager describes")
+    other = " ".join(f"Unrelated text {i} about nursing shifts and patient care." for i in range(20))
+    assert similarity(minhash(DESCRIPTION), minhash(repost)) > 0.85
+    assert similarity(minhash(DESCRIPTION), minhash(other)) < 0.2
+
+
+def test_duplicate_index_matches_within_a_company():
+    index = DuplicateIndex(threshold=0.85)
+    signature = minhash(DESCRIPTION)
+    repost = minhash(DESCRIPTION + " Apply today.")
+    try:
+        assert index.canonical("a1", "Acme", signature) is None
+        assert index.canonical("a2", "Acme", repost) == "a1"
+        #? Other employers posting the same text stay separate jobs
+        assert index.canonical("b1", "Globex", signature) is None
+        assert index.canonical("b2", "Globex", repost) == "b1"
+        assert index.canonical("a3", "Acme", minhash("Entirely different nursing role with night shifts and patient care")) is None
+    finally:
+        index.close()
+
+
+def test_deduplicator_merges_copies_onto_canonical_job(ingest, fixture_jobs):
+    from vectorDB import vector_search
+    from vectorDB.chunk_store import is_shared
+
+    companies = {job["jobkey"]: job["companyName"] for job in fixture_jobs}
+    client = ingest("test_dedupe", share_chunks=False)
+
+    points, _ = client.scroll("test_dedupe", limit=1000, with_payload=True)
+    stored = {point.payload["jobkey"] for point in points if not is_shared(point.payload)}
+    merged = {jobkey: card for jobkey, card in get_doc_store().get_cards(list(stored)).items() if card.get("duplicateJobkeys")}
+    assert merged
+
+    for canonical, card in merged.items():
+        for duplicate in card["duplicateJobkeys"]:
+            assert duplicate not in stored
+            assert companies[duplicate] == companies[canonical]
+            city = next(job for job in fixture_jobs if job["jobkey"] == duplicate)["locationInfo"]["jobLocationCity"]
+            assert city.casefold() in card["filters"]["city"]
+            assert len(card["locations"]) == len(card["duplicateJobkeys"]) + 1
+
+            #? A filter on a merged copy's city finds the canonical job
+            embeddings = vector_search.get_embeddings([card["jobTitle"]], "local-hashing")
+            hits = vector_search.vector_search(embeddings, {"filter_city": city}, "test_dedupe", k=50, use_cache=False)
+            assert canonical in [hit.payload["jobkey"] for hit in hits]
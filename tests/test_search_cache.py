@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from qdrant_client import models
+
+from vectorDB.search_cache import SearchCache, resume_fingerprint, search_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SearchCache(str(tmp_path / "search.sqlite"), ttl=60, max_entries=3)
+    yield cache
+    cache.close()
+
+
+def results(*jobkeys: str) -> list[models.ScoredPoint]:
+    return [models.ScoredPoint(id=i, version=0, score=1.0 - i / 10, payload={"jobkey": jobkey}) for i, jobkey in enumerate(jobkeys)]
+
+
+def test_search_key_normalizes_filters():
+    fingerprint = resume_fingerprint([[0.1, 0.2]], "python sql")
+    key = search_key(fingerprint, {"filter_city": "NYC", "filter_state": ""}, "ds_jobs", k=10)
+    assert key == search_key(fingerprint, {"filter_city": " new  york "}, "ds_jobs", k=10)
+    assert key != search_key(fingerprint, {"filter_city": "Boston"}, "ds_jobs", k=10)
+    assert key != search_key(fingerprint, {"filter_city": "NYC"}, "other_jobs", k=10)
+    assert key != search_key(fingerprint, {"filter_city": "NYC"}, "ds_jobs", k=20)
+
+
+def test_resume_fingerprint():
+    assert resume_fingerprint([[0.1, 0.2]]) == resume_fingerprint([[0.1, 0.2]], "")
+    assert resume_fingerprint([[0.1, 0.2]]) != resume_fingerprint([[0.1, 0.2]], "python")
+    assert resume_fingerprint([[0.1, 0.2]]) != resume_fingerprint([[0.2, 0.1]])
+
+
+def test_round_trip(cache):
+    cache.put("a", "ds_jobs", results("x", "y"))
+    assert [(p.id, p.score, p.payload) for p in cache.get("a")] == [(p.id, p.score, p.payload) for p in results("x", "y")]
+    assert cache.get("missing") is None
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_entries_expire(cache, monkeypatch):
+    cache.put("a", "ds_jobs", results("x"))
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    for key in "abc":
+        cache.put(key, "ds_jobs", results(key))
+        now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.put("d", "ds_jobs", results("d"))
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+
+
+def test_invalidate_only_drops_its_collection(cache):
+    cache.put("a", "ds_jobs", results("x"))
+    cache.put("b", "other_jobs", results("y"))
+    cache.invalidate("ds_jobs")
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
@@ -0,0 +1,17 @@
+from qdrant_client import models
+
+from vectorDB import vector_search
+
+
+def hit(jobkey: str, score: float) -> models.ScoredPoint:
+    return models.ScoredPoint(id=f"{jobkey}-{score}", version=0, score=score, payload={"jobkey": jobkey})
+
+
+def test_merge_results_orders_dedupes_and_caps():
+    a = [hit("x", 0.9), hit("y", 0.7), hit("z", 0.2)]
+    b = [hit("w", 0.8), hit("x", 0.6), hit("v", 0.1)]
+    merged = vector_search.merge_results([a, b], k=10)
+    assert [(p.payload["jobkey"], p.score) for p in merged] == [("x", 0.9), ("w", 0.8), ("y", 0.7), ("z", 0.2), ("v", 0.1)]
+    assert [p.payload["jobkey"] for p in vector_search.merge_results([a, b], k=3)] == ["x", "w", "y"]
+    assert vector_search.merge_results([], k=3) == []
+    assert vector_search.merge_results([[], a], k=1) == a[:1]
@@ -0,0 +1,31 @@
+import pytest
+
+from vectorDB import vector_store
+
+from conftest import MODEL
+
+
+def test_input_files_lists_jobs_and_pdfs(tmp_path):
+    for name in ("a.json", "b.jsonl", "c.pdf", "d.txt"):
+        (tmp_path / name).write_bytes(b"")
+    assert sorted(path.rsplit("/", 1)[-1] for path in vector_store.input_files(str(tmp_path))) == ["a.json", "b.jsonl", "c.pdf"]
+
+
+def test_pdf_pages_are_chunked(byte_encoding, tmp_path):
+    pymupdf = pytest.importorskip("pymupdf")
+    path = tmp_path / "resume.pdf"
+    pdf = pymupdf.open()
+    for page_text in ("Short first page.", " ".join(f"Sentence {i} of a long page." for i in range(40))):
+        page = pdf.new_page()
+        page.insert_textbox(pymupdf.Rect(36, 36, 560, 800), page_text, fontsize=9)
+    pdf.save(str(path))
+
+    pages = list(vector_store.iter_pdfs([str(tmp_path / "jobs.json"), str(path)], MODEL))
+    assert len(pages) == 2
+    assert [chunk.text for chunk in pages[0].chunks] == ["Short first page."]
+    #? A page longer than a chunk keeps every chunk, each under its own point
+    assert len(pages[1].chunks) > 1
+    assert "Sentence 39" in pages[1].chunks[-1].text
+    ids = [chunk.id for page in pages for chunk in page.chunks]
+    assert len(set(ids)) == len(ids)
+    assert all(page.document is None for page in pages)
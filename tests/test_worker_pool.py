@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from vectorDB import worker_pool
+from vectorDB.ingest_pipeline import bounded_imap_unordered
+
+
+def broken_init(model_name: str):
+    raise RuntimeError(f"Could not load the tokenizer for {model_name}")
+
+
+def warm_init(model_name: str):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def close_pool():
+    yield
+    worker_pool.close_pool()
+
+
+def test_pool_runs_tasks():
+    pool = worker_pool.get_pool(2, warm_init, ("local-hashing",))
+    assert worker_pool.get_pool(2, warm_init, ("local-hashing",)) is pool
+    assert sorted(bounded_imap_unordered(pool, abs, range(-5, 0), 2, worker_pool.check_pool)) == [1, 2, 3, 4, 5]
+
+
+def test_workers_that_cannot_start_fail_fast():
+    #? Pool restarts a worker whose initializer raises forever, the run must stop with the error instead of hanging
+    pool = worker_pool.get_pool(2, broken_init, ("local-hashing",))
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="Could not load the tokenizer for local-hashing"):
+        list(bounded_imap_unordered(pool, abs, range(5), 2, worker_pool.check_pool))
+    assert time.monotonic() - start < 60